@@ -0,0 +1,391 @@
+# api.py
+# 本地 HTTP 评分服务：学籍系统等程序直接提交成绩表并下载结果，不需要通过浏览器操作 Streamlit 页面。
+# 提交的文件写入独立的任务目录后进入队列，由常驻的工作进程池评分（进程启动时预先导入评分模块、加载所有评分标准）；
+# 排队和运行中的任务达到上限时返回 503，调用方按 Retry-After 稍后重试。结果文件按块流式下载。
+# 只依赖标准库，默认只监听本机。
+#
+# 接口：
+#   POST /jobs?standard=<标准名>&zip=1&filename=<原文件名>   请求体为 .xlsx/.csv/.parquet 文件内容，返回 202 和任务号
+#   GET  /jobs/<任务号>                   任务状态、结果文件和运行指标
+#   GET  /jobs/<任务号>/total             下载总表
+#   GET  /jobs/<任务号>/classes/<班级>     下载某个班级的分班表
+#   GET  /jobs/<任务号>/zip               下载全部分班表的 zip（未随任务生成时现场打包）
+#   GET  /standards                       可用的评分标准
+#   GET  /health                          队列、工作进程和吞吐量
+#
+# 用法：
+#   python api.py --port 8600 --workers 2
+#   curl -X POST --data-binary @成绩.xlsx "http://127.0.0.1:8600/jobs?filename=成绩.xlsx"
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from class_export import default_workers
+from columnar import input_suffix
+from rule_registry import REGISTRY
+from workspace import JOB_TTL, JobWorkspace, cleanup_expired
+
+API_HOST = os.environ.get('SCORING_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('SCORING_API_PORT', 8600))
+# 排队和运行中的任务数上限（默认为工作进程数的 4 倍），超出时拒绝新任务
+API_QUEUE = int(os.environ.get('SCORING_API_QUEUE', 0)) or None
+API_MAX_UPLOAD = int(os.environ.get('SCORING_API_MAX_UPLOAD_MB', 50)) * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+RETRY_AFTER = 5
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class QueueFull(Exception):
+    pass
+
+def _warm_worker():
+    """工作进程初始化：导入评分流程（含按需导入的 openpyxl/xlsxwriter）并编译所有评分标准，首个任务不再付这笔开销。"""
+    import openpyxl  # noqa: F401
+    import result_cache  # noqa: F401
+    from excel_writer import HAS_XLSXWRITER
+    if HAS_XLSXWRITER:
+        import xlsxwriter  # noqa: F401
+    REGISTRY.standards()
+
+def _ping():
+    return os.getpid()
+
+def _score_job(file_path, output_dir, standard, make_zip):
+    """在工作进程中评分一个任务，返回可序列化的结果摘要；无有效数据时返回 None。"""
+    from metrics import RunMetrics
+    from result_cache import cached_process_scores
+
+    metrics = RunMetrics(source=file_path)
+    manifest = cached_process_scores(file_path, output_dir=output_dir, export_workers=1, make_zip=make_zip,
+                                     metrics=metrics, standard=standard)
+    if manifest is None:
+        return None
+    return {
+        'timestamp': manifest['timestamp'],
+        'standard': manifest['standard'],
+        'cache_hit': manifest['cache_hit'],
+        'rows': len(manifest['final_result']),
+        'total_file': manifest['total_file'],
+        'class_files': {str(r['班级']): r['文件'] for r in manifest['export_records'] if r['错误'] is None},
+        'export_errors': {str(r['班级']): r['错误'] for r in manifest['export_records'] if r['错误'] is not None},
+        'zip_file': manifest['zip_file'],
+        'metrics': metrics.to_dict(),
+    }
+
+class ApiJob:
+    """一个通过 HTTP 提交的评分任务。status 依次为 queued / running，最后为 done、no_data 或 failed。"""
+
+    def __init__(self, workspace, file_path, file_name, standard, make_zip):
+        self.workspace = workspace
+        self.file_path = file_path
+        self.file_name = file_name
+        self.standard = standard
+        self.make_zip = make_zip
+        self.future = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self._zip_lock = threading.Lock()
+
+    @property
+    def job_id(self):
+        return self.workspace.job_id
+
+    @property
+    def status(self):
+        if self.finished is not None:
+            if self.error is not None:
+                return 'failed'
+            return 'done' if self.result is not None else 'no_data'
+        return 'running' if self.future is not None and self.future.running() else 'queued'
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def to_dict(self):
+        info = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'file_name': self.file_name,
+            'standard': self.standard,
+            'submitted': self.submitted,
+            'finished': self.finished,
+            'error': self.error,
+        }
+        if self.result is not None:
+            result = self.result
+            info.update({
+                'rows': result['rows'],
+                'standard': result['standard'],
+                'cache_hit': result['cache_hit'],
+                'downloads': {
+                    'total': f"/jobs/{self.job_id}/total",
+                    'classes': {name: f"/jobs/{self.job_id}/classes/{quote(name, safe='')}" for name in result['class_files']},
+                    'zip': f"/jobs/{self.job_id}/zip",
+                },
+                'export_errors': result['export_errors'],
+                'metrics': result['metrics'],
+            })
+        return info
+
+    def zip_file(self):
+        """全部分班表的 zip；任务没有生成 zip 时把已写出的分班表打包到任务目录（只打包一次）。"""
+        with self._zip_lock:
+            result = self.result
+            if result['zip_file'] is None:
+                path = self.workspace.file(f"分班_评分结果_{result['timestamp']}.zip")
+                with zipfile.ZipFile(path + '.tmp', 'w', zipfile.ZIP_DEFLATED) as zf:
+                    for file_path in result['class_files'].values():
+                        zf.write(file_path, os.path.basename(file_path))
+                os.replace(path + '.tmp', path)
+                result['zip_file'] = path
+            return result['zip_file']
+
+class ScoringService:
+    """
+    任务队列和常驻工作进程池。submit 在排队和运行中的任务达到 max_queue 时抛出 QueueFull；
+    已结束的任务和任务目录保留 ttl 秒供下载。
+    """
+
+    def __init__(self, workers=None, max_queue=None, ttl=None):
+        self.workers = workers or default_workers()
+        self.max_queue = max_queue or API_QUEUE or self.workers * 4
+        self.ttl = JOB_TTL if ttl is None else ttl
+        self.jobs = {}
+        self.completed = 0
+        self.busy_seconds = 0.0
+        self.started = time.time()
+        self._lock = threading.RLock()
+        self.pool = self._start_pool()
+
+    def _start_pool(self):
+        # 服务本身是多线程的，工作进程用 spawn 启动，避免 fork 时复制其他线程持有的锁
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_warm_worker)
+        # 同时提交 workers 个空任务，让所有工作进程在第一个请求到来之前启动并完成预热
+        pids = {f.result() for f in [pool.submit(_ping) for _ in range(self.workers)]}
+        print(f"🔥 已预热 {len(pids)} 个评分工作进程")
+        return pool
+
+    def active(self):
+        """排队和运行中的任务数。"""
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if not job.done)
+
+    def submit(self, job):
+        with self._lock:
+            self.prune()
+            if self.active() >= self.max_queue:
+                raise QueueFull(f"评分队列已满（{self.max_queue} 个任务），请稍后重试")
+            args = (job.file_path, job.workspace.path, job.standard, job.make_zip)
+            try:
+                job.future = self.pool.submit(_score_job, *args)
+            except BrokenProcessPool:
+                print("⚠️ 评分工作进程异常退出，正在重启进程池")
+                self.pool = self._start_pool()
+                job.future = self.pool.submit(_score_job, *args)
+            self.jobs[job.job_id] = job
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job, future):
+        try:
+            job.result = future.result()
+        except Exception as e:
+            print(f"❌ 评分任务 {job.job_id} 失败：{e}")
+            job.error = f"{type(e).__name__}: {e}"
+        job.finished = time.time()
+        with self._lock:
+            self.completed += 1
+            if job.result is not None:
+                self.busy_seconds += job.result['metrics']['total_seconds'] or 0.0
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def prune(self):
+        """移除结束超过 ttl 的任务及其目录（调用方持有锁）。"""
+        now = time.time()
+        expired = [job for job in self.jobs.values() if job.done and now - job.finished > self.ttl]
+        for job in expired:
+            del self.jobs[job.job_id]
+            job.workspace.remove()
+        return len(expired)
+
+    def health(self):
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': statuses.count('queued'),
+                'running': statuses.count('running'),
+                'completed': self.completed,
+                'uptime_seconds': round(time.time() - self.started, 1),
+                'avg_job_seconds': round(self.busy_seconds / self.completed, 3) if self.completed else None,
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    server_version = 'StudentScoring/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {'error': message}, headers)
+
+    def send_file(self, path, mime):
+        """按 CHUNK_SIZE 分块发送文件，不把整个文件读入内存。"""
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return self.send_error_json(410, "结果文件已过期或被清理")
+        with f:
+            self.send_response(200)
+            self.send_header('Content-Type', mime)
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(os.path.basename(path))}")
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    def do_GET(self):
+        parts = [unquote(p) for p in urlsplit(self.path).path.strip('/').split('/') if p]
+        if parts == ['health']:
+            return self.send_json(200, self.service.health())
+        if parts == ['standards']:
+            return self.send_json(200, {'standards': list(REGISTRY.standards())})
+        if len(parts) < 2 or parts[0] != 'jobs':
+            return self.send_error_json(404, "未知的接口")
+
+        job = self.service.get(parts[1])
+        if job is None:
+            return self.send_error_json(404, f"任务不存在或已过期：{parts[1]}")
+        if len(parts) == 2:
+            return self.send_json(200, job.to_dict())
+        if job.status != 'done':
+            return self.send_error_json(409, f"任务尚未完成或没有结果（{job.status}）")
+        job.workspace.touch()
+
+        result = job.result
+        if parts[2:] == ['total']:
+            return self.send_file(result['total_file'], XLSX_MIME)
+        if parts[2:] == ['zip']:
+            return self.send_file(job.zip_file(), 'application/zip')
+        if len(parts) == 4 and parts[2] == 'classes':
+            if parts[3] not in result['class_files']:
+                return self.send_error_json(404, f"没有班级 {parts[3]} 的分班表")
+            return self.send_file(result['class_files'][parts[3]], XLSX_MIME)
+        return self.send_error_json(404, "未知的接口")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self.send_error_json(404, "未知的接口")
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            return self.send_error_json(411, "需要 Content-Length")
+        length = int(length)
+        if length == 0:
+            return self.send_error_json(400, "请求体为空，应为成绩表文件内容")
+        if length > API_MAX_UPLOAD:
+            self.close_connection = True
+            return self.send_error_json(413, f"文件超过 {API_MAX_UPLOAD // (1024 * 1024)} MB 上限")
+
+        standard = query.get('standard') or None
+        try:
+            REGISTRY.get(standard)
+        except ValueError as e:
+            self.close_connection = True
+            return self.send_error_json(400, str(e))
+        if self.service.active() >= self.service.max_queue:
+            # 提前拒绝，不必先接收整个文件
+            self.close_connection = True
+            return self.send_error_json(503, "评分队列已满，请稍后重试", {'Retry-After': str(RETRY_AFTER)})
+
+        file_name = query.get('filename') or self.headers.get('X-File-Name') or 'raw_scores.xlsx'
+        workspace = JobWorkspace()
+        upload = workspace.file(f"raw_scores{input_suffix(file_name)}")
+        with open(upload, 'wb') as f:
+            remaining = length
+            while remaining:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    workspace.remove()
+                    self.close_connection = True
+                    return self.send_error_json(400, "上传中断")
+                f.write(chunk)
+                remaining -= len(chunk)
+
+        job = ApiJob(workspace, upload, file_name, standard, query.get('zip') in ('1', 'true', 'yes'))
+        try:
+            self.service.submit(job)
+        except QueueFull as e:
+            workspace.remove()
+            return self.send_error_json(503, str(e), {'Retry-After': str(RETRY_AFTER)})
+        print(f"📥 收到评分任务 {job.job_id}：{file_name}（{length / 1024:.0f} KB）")
+        return self.send_json(202, {'job_id': job.job_id, 'status': job.status, 'url': f"/jobs/{job.job_id}"},
+                              {'Location': f"/jobs/{job.job_id}"})
+
+def make_server(host=None, port=None, workers=None, max_queue=None):
+    server = ThreadingHTTPServer((host or API_HOST, API_PORT if port is None else port), ScoringHandler)
+    server.daemon_threads = True
+    server.service = ScoringService(workers=workers, max_queue=max_queue)
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地 HTTP 评分服务')
+    parser.add_argument('--host', default=API_HOST, help='监听地址（默认只监听本机）')
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--workers', type=int, default=None, help='评分工作进程数（默认 CPU 核数）')
+    parser.add_argument('--max-queue', type=int, default=None, help='排队和运行中的任务数上限（默认为工作进程数的 4 倍）')
+    args = parser.parse_args(argv)
+
+    removed = cleanup_expired()
+    if removed:
+        print(f"🧹 已清理 {removed} 个过期任务目录")
+    server = make_server(args.host, args.port, args.workers, args.max_queue)
+    service = server.service
+    print(f"🚀 评分服务已启动：http://{args.host}:{server.server_address[1]}"
+          f"（{service.workers} 个工作进程，队列上限 {service.max_queue}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+if __name__ == '__main__':
+    main()
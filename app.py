@@ -1,79 +1,141 @@
+import time
 import streamlit as st
-import pandas as pd
-from scoring_script import process_scores
-import os
 
 st.set_page_config(page_title="学生体测评分系统", layout="wide")
 st.title("🏃‍♂️ 学生体测评分系统")
 st.subheader("📥 下载评分模板")
 
-with open("评分模板.xlsx", "rb") as f:
-    st.download_button(
-        label="⬇️ 下载标准评分模板",
-        data=f,
-        file_name="评分模板.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-# 初始化 session_state
-if "scored" not in st.session_state:
-    st.session_state.scored = False
-    st.session_state.total_file = None
+@st.cache_data
+def template_bytes():
+    """评分模板文件的内容，整个服务进程只读一次。"""
+    with open("评分模板.xlsx", "rb") as f:
+        return f.read()
 
-uploaded_file = st.file_uploader("请上传原始 Excel 文件（.xlsx）", type=["xlsx"])
+st.download_button(
+    label="⬇️ 下载标准评分模板",
+    data=template_bytes(),
+    file_name="评分模板.xlsx",
+    mime=XLSX_MIME
+)
 
-if uploaded_file is not None:
-    # 保存上传的文件
-    with open("raw_scores.xlsx", "wb") as f:
-        f.write(uploaded_file.getbuffer())
+# 模板按钮先显示，再导入评分相关模块（pandas、评分规则等），服务冷启动时页面更快可用；
+# 之后每次重跑这些模块都已导入，不会重复加载
+from cohort_stats import SUMMARY_SHEET  # noqa: E402
+from columnar import input_suffix  # noqa: E402
+from header_aliases import format_aliases  # noqa: E402
+from jobs import JobRegistry  # noqa: E402
+from rule_registry import available_standards  # noqa: E402
+from scoring_script import display_result  # noqa: E402
+from workspace import JobWorkspace, cleanup_expired  # noqa: E402
 
-    if not st.session_state.scored:
-        st.success("✅ 文件上传成功，正在评分中...")
+@st.cache_resource
+def job_registry():
+    """整个服务进程共用一个后台任务登记表，不同会话提交相同文件时共用同一个评分任务。"""
+    return JobRegistry()
 
-        try:
-            total_file = process_scores("raw_scores.xlsx")
-        except Exception as e:
-            st.error(f"❌ 评分过程中发生错误：{e}")
-            st.stop()
+def lazy_download(label, lazy_file, mime, key, with_progress=False):
+    """结果文件只在用户点击“生成”后才序列化，之后直接提供下载；with_progress 时生成过程显示进度条。"""
+    if lazy_file.ready or st.button(f"📄 生成：{lazy_file.file_name}", key=f"{key}_build"):
+        if with_progress and not lazy_file.ready:
+            bar = st.progress(0.0, text=f"正在生成：{lazy_file.file_name}")
+            lazy_file.getvalue(progress=lambda fraction, message: bar.progress(fraction, text=message))
+            bar.empty()
+        st.download_button(
+            label=label,
+            data=lazy_file.getvalue(),
+            file_name=lazy_file.file_name,
+            mime=mime,
+            key=f"{key}_download"
+        )
 
-        if total_file is None or not os.path.exists(total_file):
-            st.error("❌ 没有找到评分结果文件，请确认表格内容是否符合要求。")
-            st.stop()
+# 初始化 session_state：每个会话有自己的任务目录，并记住所提交后台任务的键
+if "job" not in st.session_state:
+    st.session_state.job = None
+    st.session_state.upload_id = None
+    st.session_state.job_key = None
 
-        st.session_state.scored = True
-        st.session_state.total_file = total_file
-    else:
-        total_file = st.session_state.total_file
+# 规则目录中的标准文件修改后，下一次页面运行即按新内容评分；
+# 登记表本身就是整个服务进程共用的单例，规则表在第一次评分时才编译，列出标准不需要编译
+standard = st.selectbox("📏 评分标准", available_standards(), help="不同年级、年份的评分表可放在评分标准目录中，修改后自动生效")
+
+uploaded_file = st.file_uploader("请上传原始 Excel 文件（.xlsx），也可以是 CSV/Parquet 表格", type=["xlsx", "csv", "parquet"])
+
+if uploaded_file is not None:
+    registry = job_registry()
+    upload_id = f"{uploaded_file.file_id}|{standard}"
+    if st.session_state.upload_id != upload_id:
+        # 新上传的文件：清理过期任务，在独立目录中保存后提交后台评分
+        cleanup_expired()
+        previous = registry.get(st.session_state.job_key) if st.session_state.job_key else None
+        if st.session_state.job is not None and (previous is None or previous.done):
+            # 上一个任务仍在运行时保留其目录，交给 TTL 清理
+            st.session_state.job.remove()
+        job = JobWorkspace()
+        raw_file = job.save_upload(uploaded_file.getbuffer(), name=f"raw_scores{input_suffix(uploaded_file.name)}")
+        scoring_job = registry.submit(raw_file, output_dir=job.path, in_memory=True, standard=standard)
+        st.session_state.job = job
+        st.session_state.upload_id = upload_id
+        st.session_state.job_key = scoring_job.key
+
+    scoring_job = registry.get(st.session_state.job_key)
+    if scoring_job is None:
+        st.error("❌ 评分结果已过期，请重新上传文件。")
+        st.session_state.upload_id = None
+        st.stop()
 
-    # 显示评分结果
-    result_df = pd.read_excel(total_file)
+    if not scoring_job.done:
+        # 评分在后台进行，页面定时重跑以刷新进度
+        st.success("✅ 文件上传成功，正在评分中（相同文件会直接复用已有结果）...")
+        st.progress(scoring_job.progress, text=f"⏳ {scoring_job.message}")
+        time.sleep(0.5)
+        st.rerun()
 
+    if scoring_job.status == 'failed':
+        st.error(f"❌ 评分过程中发生错误：{scoring_job.error}")
+        st.stop()
+
+    manifest = scoring_job.manifest
+    if manifest is None:
+        st.error("❌ 没有找到评分结果，请确认表格内容是否符合要求。")
+        st.stop()
+    st.session_state.job.touch()
+
+    # 显示评分结果（只把前 30 行转为导出时的“无”/备注写法）
     st.subheader("📊 总表评分结果预览（前 30 行）")
-    st.dataframe(result_df.head(30), use_container_width=True)
+    st.dataframe(display_result(manifest['final_result'].head(30)), use_container_width=True)
 
-    with open(total_file, "rb") as f:
-        st.download_button(
-            label="⬇️ 下载总评分结果 Excel 文件",
-            data=f,
-            file_name=total_file,
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    with st.expander("📈 班级/性别统计（均分、及格率、平均分分布）"):
+        st.dataframe(manifest['cohort_stats'][SUMMARY_SHEET], use_container_width=True, hide_index=True)
+        st.caption("每名学生的班内排名和年级百分位见总表 Excel 的“排名”工作表")
+
+    lazy_download("⬇️ 下载总评分结果 Excel 文件", manifest['total_workbook'], XLSX_MIME, "total")
 
     st.subheader("📁 分班评分结果下载")
 
-    class_files = [
-        f for f in os.listdir()
-        if f.endswith(".xlsx") and f.startswith("_") is False and "总表" not in f
-    ]
-
-    if class_files:
-        for file in sorted(class_files):
-            with open(file, "rb") as f:
-                st.download_button(
-                    label=f"⬇️ 下载：{file}",
-                    data=f,
-                    file_name=file,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+    class_workbooks = manifest['class_workbooks']
+
+    if class_workbooks:
+        lazy_download("⬇️ 一次性下载全部分班文件", manifest['zip_archive'], "application/zip", "zip", with_progress=True)
+        for i, workbook in enumerate(class_workbooks):
+            lazy_download(f"⬇️ 下载：{workbook.file_name}", workbook, XLSX_MIME, f"class_{i}")
     else:
         st.info("暂无分班文件，请确认评分已完成并包含班级字段。")
+
+    # 分阶段耗时（放在页面最后，本次点击生成的文件也能计入）
+    metrics = manifest['metrics']
+    with st.expander(f"⏱️ 评分耗时明细（共 {metrics.total_seconds:.2f} 秒）"):
+        if manifest.get('cache_hit'):
+            st.caption("⚡ 本次直接复用了缓存的评分结果")
+        st.write(f"段落数：{metrics.counts.get('segments', 0)}，有效行数：{len(manifest['final_result'])}，"
+                 f"吞吐量：{metrics.rows_per_sec or '-'} 行/秒，内存峰值：{metrics.peak_rss_mb or '-'} MB")
+        if metrics.header_aliases:
+            st.caption(f"🔤 已按别名识别的表头：{format_aliases(metrics.header_aliases.items())}")
+        if metrics.unsupported_columns:
+            st.warning(f"⚠️ 评分标准不支持的项目，未评分：{'、'.join(metrics.unsupported_columns)}")
+        st.table(metrics.breakdown())
+        built = [manifest['total_workbook'], manifest['zip_archive']] + manifest['class_workbooks']
+        built = [{'文件': f.file_name, '耗时(秒)': round(f.build_seconds, 3)} for f in built if f.ready]
+        if built:
+            st.table(built)
@@ -0,0 +1,237 @@
+# batch.py
+# 批量评分命令行：对一个目录或通配符匹配到的所有成绩表，用进程池并行调用 process_scores，
+# 每个输入文件的结果写到输出目录下的同名子目录中。已评分且内容未变的文件在重跑时跳过，
+# 结束后打印每个文件的耗时、状态和失败原因，并保存一份汇总 JSON。
+#
+# 用法：
+#   python batch.py 期末成绩/ --output-dir 评分结果
+#   python batch.py "期末成绩/*.xlsx" --workers 4 --zip
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from class_export import default_workers
+from columnar import COLUMNAR_FORMATS, TABLE_INPUTS
+from header_aliases import format_aliases
+from incremental import incremental_process_scores
+from metrics import RunMetrics
+from result_cache import cache_key
+from rule_registry import get_rules
+from scoring_script import process_scores
+
+# 子目录中记录“已完成”的标记文件，内容含输入文件的哈希（包含评分规则版本）
+DONE_NAME = 'batch_done.json'
+
+INPUT_EXTENSIONS = ('.xlsx',) + TABLE_INPUTS
+
+def find_inputs(patterns):
+    """把目录、文件和通配符展开为去重、排序后的成绩表列表（.xlsx/.csv/.parquet，忽略 Excel 的 ~$ 临时文件）。"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '*'))
+        else:
+            matches = glob.glob(pattern)
+        paths.extend(p for p in matches
+                     if p.lower().endswith(INPUT_EXTENSIONS) and not os.path.basename(p).startswith('~$'))
+    return sorted(set(os.path.abspath(p) for p in paths))
+
+def output_dirs(inputs, output_root):
+    """
+    每个输入对应 output_root 下以文件名命名的子目录；本次输入中有同名文件（位于不同目录）时
+    加路径哈希区分，因此续跑时应使用与上次相同的输入范围。
+    """
+    stems = {}
+    for path in inputs:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        stems.setdefault(stem, []).append(path)
+    dirs = {}
+    for stem, paths in stems.items():
+        for path in paths:
+            name = stem if len(paths) == 1 else f"{stem}_{hashlib.sha1(path.encode('utf-8')).hexdigest()[:6]}"
+            dirs[path] = os.path.join(output_root, name)
+    return dirs
+
+def file_key(path, standard=None):
+    with open(path, 'rb') as f:
+        return cache_key(f.read(), standard)
+
+def is_done(path, out_dir, standard=None):
+    """子目录中有完成标记且记录的哈希（含评分标准）与当前输入一致时视为已评分。"""
+    try:
+        with open(os.path.join(out_dir, DONE_NAME), encoding='utf-8') as f:
+            done = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return done.get('key') == file_key(path, standard)
+
+def score_one(path, out_dir, make_zip=False, metrics_log=None, quiet=False, incremental=False, columnar=None,
+              standard=None):
+    """
+    评分单个输入文件（在进程池的工作进程中运行），返回一条批量记录：
+    文件 / 输出目录 / 状态（完成、无有效数据、失败）/ 行数 / 分班文件数 / 耗时 / 错误 / 阶段耗时。
+    incremental 为 True 时用 incremental_process_scores，只重新评分与上次相比变动的行和班级；
+    columnar 为 'parquet' 或 'arrow' 时另外导出列式总表；standard 为评分标准名称（默认为内置标准）。
+    """
+    start = time.perf_counter()
+    record = {'文件': path, '输出目录': out_dir, '状态': '失败', '行数': 0, '分班文件数': 0,
+              '耗时': 0.0, '错误': None, '阶段耗时': {}}
+    metrics = RunMetrics(source=path, log_path=metrics_log)
+    log = io.StringIO()
+    try:
+        key = file_key(path, standard)
+        os.makedirs(out_dir, exist_ok=True)
+        with contextlib.redirect_stdout(log) if quiet else contextlib.nullcontext():
+            # 文件之间已经并行，分班导出在本进程内顺序写出
+            if incremental:
+                manifest = incremental_process_scores(path, output_dir=out_dir, export_workers=1, make_zip=make_zip,
+                                                      metrics=metrics, columnar=columnar, standard=standard)
+            else:
+                manifest = process_scores(path, output_dir=out_dir, export_workers=1, make_zip=make_zip,
+                                          metrics=metrics, columnar=columnar, standard=standard)
+        if manifest is None:
+            record['状态'] = '无有效数据'
+        else:
+            failed = [r for r in manifest['export_records'] if r['错误'] is not None]
+            record['行数'] = len(manifest['final_result'])
+            record['分班文件数'] = len(manifest['class_files'])
+            if failed:
+                record['错误'] = '；'.join(f"{r['班级']}：{r['错误']}" for r in failed)
+            else:
+                record['状态'] = '完成'
+                with open(os.path.join(out_dir, DONE_NAME), 'w', encoding='utf-8') as f:
+                    json.dump({'source': path, 'key': key, 'finished': datetime.now().isoformat(timespec='seconds'),
+                               'rows': record['行数'], 'standard': manifest['standard']}, f, ensure_ascii=False)
+    except Exception as e:
+        record['错误'] = f"{type(e).__name__}: {e}"
+    record['耗时'] = time.perf_counter() - start
+    record['阶段耗时'] = {name: round(seconds, 4) for name, seconds in metrics.stages.items()}
+    record['表头别名'] = dict(metrics.header_aliases)
+    record['未评分项目'] = list(metrics.unsupported_columns)
+    return record
+
+def _run_parallel(jobs, workers, options, records):
+    """并行评分，完成一个就追加到 records（进程池中途不可用时，调用方据此只补跑剩下的文件）。"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(score_one, path, out_dir, **options): path for path, out_dir in jobs}
+        for future in as_completed(futures):
+            record = future.result()
+            _print_progress(record, len(records) + 1, len(jobs))
+            records.append(record)
+
+def _print_progress(record, done, total):
+    icon = {'完成': '✅', '无有效数据': '⚠️'}.get(record['状态'], '❌')
+    print(f"{icon} [{done}/{total}] {os.path.basename(record['文件'])}：{record['状态']}（{record['耗时']:.1f}s）")
+
+def run_batch(inputs, output_root, workers=None, make_zip=False, force=False, metrics_log=None, quiet=True,
+              incremental=False, columnar=None, standard=None):
+    """
+    批量评分 inputs 中的文件，返回按输入顺序排列的记录列表（已跳过的文件状态为“跳过”）。
+    force 为 True 时忽略完成标记全部重新评分；workers<=1 时在当前进程顺序评分。
+    """
+    dirs = output_dirs(inputs, output_root)
+    jobs, skipped = [], []
+    for path in inputs:
+        if not force and is_done(path, dirs[path], standard):
+            skipped.append({'文件': path, '输出目录': dirs[path], '状态': '跳过', '行数': 0, '分班文件数': 0,
+                            '耗时': 0.0, '错误': None, '阶段耗时': {}})
+        else:
+            jobs.append((path, dirs[path]))
+    if skipped:
+        print(f"⏭️ 跳过 {len(skipped)} 个已评分且未修改的文件")
+
+    options = {'make_zip': make_zip, 'metrics_log': metrics_log, 'quiet': quiet, 'incremental': incremental,
+               'columnar': columnar, 'standard': standard}
+    workers = default_workers() if workers is None else workers
+    workers = min(workers, len(jobs))
+    records = []
+    if workers > 1:
+        try:
+            _run_parallel(jobs, workers, options, records)
+        except (BrokenProcessPool, OSError) as e:
+            # 进程池不可用（受限环境等）时，剩下的文件在当前进程顺序评分
+            print(f"⚠️ 进程池不可用，改为顺序评分：{e}")
+    finished = {r['文件'] for r in records}
+    for path, out_dir in jobs:
+        if path not in finished:
+            records.append(score_one(path, out_dir, **options))
+            _print_progress(records[-1], len(records), len(jobs))
+
+    order = {path: i for i, path in enumerate(inputs)}
+    return sorted(records + skipped, key=lambda r: order[r['文件']])
+
+def print_summary(records, elapsed):
+    counts = {}
+    for record in records:
+        counts[record['状态']] = counts.get(record['状态'], 0) + 1
+    rows = sum(r['行数'] for r in records)
+    print(f"\n📊 共 {len(records)} 个文件，用时 {elapsed:.1f}s，评分 {rows} 名学生："
+          + "，".join(f"{status} {n}" for status, n in counts.items()))
+    for record in records:
+        if record['状态'] == '跳过':
+            continue
+        slowest = max(record['阶段耗时'].items(), key=lambda item: item[1], default=None)
+        detail = f"，最慢阶段 {slowest[0]} {slowest[1]:.1f}s" if slowest and record['状态'] == '完成' else ''
+        print(f"   {record['耗时']:>7.1f}s  {record['行数']:>6} 行  {record['状态']:<6}{os.path.basename(record['文件'])}{detail}")
+        if record['表头别名']:
+            print(f"            🔤 表头别名：{format_aliases(record['表头别名'].items())}")
+        if record['未评分项目']:
+            print(f"            ⚠️ 不支持的项目，未评分：{'、'.join(record['未评分项目'])}")
+    failures = [r for r in records if r['错误']]
+    if failures:
+        print("❌ 失败原因：")
+        for record in failures:
+            print(f"   {os.path.basename(record['文件'])}：{record['错误']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量评分一个目录或通配符匹配的所有成绩表')
+    parser.add_argument('inputs', nargs='+', help='目录、.xlsx/.csv/.parquet 文件或通配符（如 "成绩/*.xlsx"）')
+    parser.add_argument('--output-dir', default='批量评分结果', help='输出根目录，每个输入一个子目录')
+    parser.add_argument('--workers', type=int, default=None, help='并行评分的进程数（默认 CPU 核数）')
+    parser.add_argument('--zip', action='store_true', help='每个输入另外打包分班文件')
+    parser.add_argument('--force', action='store_true', help='忽略完成标记，全部重新评分')
+    parser.add_argument('--columnar', choices=sorted(COLUMNAR_FORMATS), help='另外导出 Parquet 或 Arrow 格式的总表')
+    parser.add_argument('--incremental', action='store_true', help='输入有修改时只重新评分变动的行，只重写变动的分班文件')
+    parser.add_argument('--standard', help='评分标准名称（“标准/年级”，默认为内置标准）')
+    parser.add_argument('--metrics-log', help='每个文件追加一行 JSON 运行指标')
+    parser.add_argument('--verbose', action='store_true', help='显示每个文件的评分过程输出')
+    args = parser.parse_args(argv)
+
+    try:
+        get_rules(args.standard)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        print("❌ 没有找到成绩表文件（.xlsx/.csv/.parquet）")
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"📥 共 {len(inputs)} 个成绩表，输出到：{args.output_dir}")
+
+    start = time.perf_counter()
+    records = run_batch(inputs, args.output_dir, workers=args.workers, make_zip=args.zip, force=args.force,
+                        metrics_log=args.metrics_log, quiet=not args.verbose, incremental=args.incremental,
+                        columnar=args.columnar, standard=args.standard)
+    elapsed = time.perf_counter() - start
+    print_summary(records, elapsed)
+
+    summary_path = os.path.join(args.output_dir, f"批量评分汇总_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({'elapsed_seconds': round(elapsed, 2), 'records': [dict(r, 耗时=round(r['耗时'], 3)) for r in records]},
+                  f, ensure_ascii=False, indent=2)
+    print(f"💾 汇总已保存：{summary_path}")
+    return 1 if any(r['状态'] == '失败' for r in records) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
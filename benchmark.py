@@ -0,0 +1,346 @@
+# benchmark.py
+# 评分流程基准测试：生成与 评分模板.xlsx 结构一致的合成成绩表（多个表头段落、合并列、脏数据），
+# 分阶段计时（读取、段落识别、评分、合并、总表导出、分班导出），记录吞吐量和内存峰值
+# （每个人数在全新的子进程中运行，内存峰值只属于这一次运行），
+# 结果写成 JSON，可与之前保存的基线对比。另外在全新的子进程中测量各入口模块的导入耗时，
+# 超出 IMPORT_BUDGETS 预算时提示（服务冷启动和每个批量/后台进程都要付这笔开销）。
+#
+# 用法：
+#   python benchmark.py --students 1000 20000 --output bench.json
+#   python benchmark.py --students 20000 --compare bench.json
+#   python benchmark.py --imports-only
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+import pandas as pd
+from openpyxl import Workbook
+from excel_reader import read_sheets, sheet_segments
+from excel_writer import write_styled_excel
+from class_export import export_class_files
+from cohort_stats import cohort_stats
+from metrics import peak_rss_mb
+from scoring_script import (STANDARD_COLUMNS, combine_results, display_result, parse_time, parse_time_series,
+                            score_raw_segment)
+
+TITLE = '基础体能测试评分表'
+MALE_HEADER = ['序号', '班级', '学号', '性别', '姓名', '引体向上', '1分钟跳绳', '立定跳远', '抛实心球', '100米', '1500米', '备注']
+FEMALE_HEADER = ['序号', '班级', '学号', '性别', '姓名', '仰卧起坐', '1分钟跳绳', '立定跳远', '抛实心球', '100米', '800米', '备注']
+COMBINED_HEADER = ['序号', '班级', '学号', '性别', '姓名', '仰卧起坐/引体向上', '800米/1500米', '1分钟跳绳', '立定跳远', '抛实心球', '100米', '备注']
+
+# 各入口模块的导入耗时预算（秒）：超出时说明又有重量级依赖被提前到了模块顶层
+IMPORT_BUDGETS = {
+    'rule_registry': 0.5,
+    'scoring_script': 1.2,
+    'jobs': 1.2,
+    'excel_writer': 0.1,
+}
+# 只在导出/读取工作簿时才需要的模块，不应在导入入口模块时加载
+DEFERRED_MODULES = ['openpyxl', 'xlsxwriter']
+
+DIRTY_VALUES = ['缺考', '免测', '', ' ', '１２', '12a', '#N/A']
+DIRTY_TIMES = ['4′20', '3:75', '3.5.1', '缺考', '4：0５']
+
+def _run_time(rng, gender):
+    base = rng.uniform(3.2, 6.0) if gender == '男' else rng.uniform(2.8, 4.5)
+    mins = int(base)
+    secs = int((base - mins) * 60)
+    form = rng.random()
+    if form < 0.4:
+        return f"{mins}:{secs:02d}"
+    if form < 0.55:
+        return f"{mins}：{secs:02d}"
+    return round(mins + secs / 100, 2)
+
+def _student_values(rng, gender):
+    """按性别生成一名学生各项目的原始成绩（合并列取同一组值）。"""
+    male = gender == '男'
+    return {
+        'core': rng.randint(0, 28) if male else rng.randint(5, 66),
+        'run': _run_time(rng, gender),
+        '1分钟跳绳': rng.randint(50, 230),
+        '立定跳远': round(rng.uniform(2.0, 2.9) if male else rng.uniform(1.6, 2.4), 2),
+        '抛实心球': round(rng.uniform(6.0, 17.5) if male else rng.uniform(4.5, 10.5), 1),
+        '100米': round(rng.uniform(11.0, 16.0) if male else rng.uniform(13.0, 18.0), 2),
+    }
+
+def _dirty(rng, value, dirty_ratio, pool):
+    r = rng.random()
+    if r < dirty_ratio / 2:
+        return None
+    if r < dirty_ratio:
+        return rng.choice(pool)
+    return value
+
+def generate_workbook(path, students=1000, classes=20, segments=4, combined_ratio=0.3, dirty_ratio=0.05, seed=0):
+    """
+    生成合成成绩表：students 名学生平均分到 segments 个表头段落，段落按性别轮换，
+    约 combined_ratio 的段落使用“仰卧起坐/引体向上”“800米/1500米”合并列，
+    约 dirty_ratio 的成绩单元格为空或脏数据（缺考、全角数字、错误时间格式等）。
+    """
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('测试名单')
+    class_names = [f"{22 + i % 3}级体育{i + 1}班" for i in range(classes)]
+    per_segment = max(1, students // segments)
+    written = 0
+    for seg in range(segments):
+        count = per_segment if seg < segments - 1 else students - written
+        gender = '男' if seg % 2 == 0 else '女'
+        combined = rng.random() < combined_ratio
+        header = COMBINED_HEADER if combined else (MALE_HEADER if gender == '男' else FEMALE_HEADER)
+        ws.append([TITLE])
+        ws.append(header)
+        for i in range(count):
+            values = _student_values(rng, gender)
+            row = []
+            for col in header:
+                if col == '序号':
+                    row.append(i + 1)
+                elif col == '班级':
+                    row.append(rng.choice(class_names))
+                elif col == '学号':
+                    row.append(22100000 + written + i)
+                elif col == '性别':
+                    row.append(gender)
+                elif col == '姓名':
+                    row.append(f"学生{written + i}")
+                elif col in ('引体向上', '仰卧起坐', '仰卧起坐/引体向上'):
+                    row.append(_dirty(rng, values['core'], dirty_ratio, DIRTY_VALUES))
+                elif col in ('1500米', '800米', '800米/1500米'):
+                    row.append(_dirty(rng, values['run'], dirty_ratio, DIRTY_TIMES))
+                elif col == '备注':
+                    row.append(None)
+                else:
+                    row.append(_dirty(rng, values[col], dirty_ratio, DIRTY_VALUES))
+            ws.append(row)
+        written += count
+        ws.append([])
+    wb.save(path)
+    return path
+
+class StageTimer:
+    """记录每个阶段的耗时和（可选）Python 内存分配峰值。"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stage = {'seconds': round(elapsed, 4)}
+            if self.trace_memory:
+                stage['peak_alloc_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+                tracemalloc.stop()
+            self.stages[name] = stage
+
+def bench_pipeline(path, workers=None, trace_memory=False):
+    """分阶段运行一次评分流程，返回各阶段计时和吞吐量。"""
+    timer = StageTimer(trace_memory)
+    out_dir = tempfile.mkdtemp(prefix='scoring_bench_')
+    try:
+        sheets = timer.run('read', lambda: [(name, list(rows)) for name, rows in read_sheets(path)])
+        segments = timer.run('segment_detection', lambda: [df for _, df in sheet_segments(sheets)])
+        results = timer.run('scoring', lambda: [r for r in map(score_raw_segment, segments) if r is not None])
+        final_result = timer.run('concat', combine_results, results)
+        stats = timer.run('cohort_stats', cohort_stats, final_result)
+        table = timer.run('display', display_result, final_result)
+        timer.run('total_export', write_styled_excel, table, os.path.join(out_dir, '总表_评分结果_bench.xlsx'),
+                  extra_sheets=stats)
+        records, _ = timer.run('class_export', export_class_files, table, STANDARD_COLUMNS, 'bench',
+                               output_dir=out_dir, workers=workers)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    students = len(final_result)
+    total = sum(stage['seconds'] for stage in timer.stages.values())
+    for stage in timer.stages.values():
+        stage['rows_per_sec'] = round(students / stage['seconds']) if stage['seconds'] else None
+    return {
+        'students': students,
+        'segments': len(segments),
+        'class_files': len(records),
+        'total_seconds': round(total, 4),
+        'rows_per_sec': round(students / total) if total else None,
+        'stages': timer.stages,
+    }
+
+def _isolated_run(path, workers, trace_memory):
+    run = bench_pipeline(path, workers=workers, trace_memory=trace_memory)
+    run['peak_rss_mb'] = peak_rss_mb()
+    return run
+
+def bench_isolated(path, workers=None, trace_memory=False):
+    """
+    在全新的子进程（spawn）中运行 bench_pipeline，并记录该进程的内存峰值。
+    ru_maxrss 是整个进程生命周期的峰值，在同一进程里连续运行多个人数时，后面的结果会带上前面较大运行的峰值。
+    分班导出的工作进程不计入。
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(_isolated_run, path, workers, trace_memory).result()
+
+def bench_parse_time(n=100000, seed=0):
+    """parse_time 逐格调用与 parse_time_series 整列解析的对比。"""
+    rng = random.Random(seed)
+    values = [_dirty(rng, _run_time(rng, rng.choice('男女')), 0.05, DIRTY_TIMES) for _ in range(n)]
+    series = pd.Series(values, dtype=object)
+
+    start = time.perf_counter()
+    for v in values:
+        parse_time(v)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_time_series(series)
+    vectorized = time.perf_counter() - start
+    return {'values': n, 'parse_time_seconds': round(scalar, 4), 'parse_time_series_seconds': round(vectorized, 4)}
+
+IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "seconds = time.perf_counter() - start\n"
+    "print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {deferred!r} if m in sys.modules]}}))\n"
+)
+
+def bench_imports(budgets=IMPORT_BUDGETS, repeat=3):
+    """
+    每个模块在全新的 Python 子进程中导入 repeat 次取最快的一次（排除磁盘缓存等干扰），
+    同时记录导入后已加载的 DEFERRED_MODULES。返回 {模块: {seconds, budget, over_budget, loaded}}。
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module, budget in budgets.items():
+        code = IMPORT_PROBE.format(module=module, deferred=DEFERRED_MODULES)
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        best = min(runs, key=lambda r: r['seconds'])
+        results[module] = {
+            'seconds': round(best['seconds'], 4),
+            'budget': budget,
+            'over_budget': best['seconds'] > budget,
+            'loaded': best['loaded'],
+        }
+    return results
+
+def print_imports(imports):
+    for module, result in imports.items():
+        flag = '⚠️' if result['over_budget'] else '  '
+        loaded = f"，已加载 {'、'.join(result['loaded'])}" if result['loaded'] else ''
+        print(f"   {flag} import {module:<16}{result['seconds']:>8.3f}s  预算 {result['budget']}s{loaded}")
+
+def compare(current, baseline):
+    """逐规模、逐阶段打印与基线的耗时比（>1 表示比基线慢）。"""
+    base_runs = {run['requested_students']: run for run in baseline.get('runs', [])}
+    for run in current['runs']:
+        base = base_runs.get(run['requested_students'])
+        if base is None:
+            print(f"⚠️ 基线中没有 {run['requested_students']} 人的结果")
+            continue
+        print(f"📊 {run['requested_students']} 人：总耗时 {run['total_seconds']}s（基线 {base['total_seconds']}s，"
+              f"×{run['total_seconds'] / base['total_seconds']:.2f}）")
+        for name, stage in run['stages'].items():
+            base_stage = base['stages'].get(name)
+            if base_stage and base_stage['seconds']:
+                ratio = stage['seconds'] / base_stage['seconds']
+                flag = '⚠️' if ratio > 1.2 else '  '
+                print(f"   {flag} {name:<18}{stage['seconds']:>9.3f}s  基线 {base_stage['seconds']:>9.3f}s  ×{ratio:.2f}")
+    for module, result in current.get('imports', {}).items():
+        base = baseline.get('imports', {}).get(module)
+        if base and base['seconds']:
+            print(f"📦 import {module}：{result['seconds']}s（基线 {base['seconds']}s，×{result['seconds'] / base['seconds']:.2f}）")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='学生体测评分流程基准测试')
+    parser.add_argument('--students', type=int, nargs='+', default=[1000, 10000], help='每次运行的学生人数（可多个）')
+    parser.add_argument('--classes', type=int, default=20, help='班级数')
+    parser.add_argument('--segments', type=int, default=4, help='表头段落数')
+    parser.add_argument('--combined-ratio', type=float, default=0.3, help='使用合并列的段落比例')
+    parser.add_argument('--dirty-ratio', type=float, default=0.05, help='空值/脏数据比例')
+    parser.add_argument('--workers', type=int, default=None, help='分班导出进程数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true', help='用 tracemalloc 记录每个阶段的内存分配峰值（会明显变慢）')
+    parser.add_argument('--keep-input', action='store_true', help='保留生成的合成成绩表')
+    parser.add_argument('--output', help='结果 JSON 路径')
+    parser.add_argument('--compare', help='与之前保存的基线 JSON 对比')
+    parser.add_argument('--imports-only', action='store_true', help='只测量模块导入耗时，不运行评分流程')
+    args = parser.parse_args(argv)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'keep_input')},
+        'runs': [],
+    }
+    report['imports'] = bench_imports()
+    print("📦 模块导入耗时（全新进程，取最快一次）：")
+    print_imports(report['imports'])
+    if args.imports_only:
+        args.students = []
+
+    work_dir = tempfile.mkdtemp(prefix='scoring_bench_input_')
+    try:
+        for students in args.students:
+            path = os.path.join(work_dir, f"synthetic_{students}.xlsx")
+            start = time.perf_counter()
+            generate_workbook(path, students, args.classes, args.segments, args.combined_ratio, args.dirty_ratio, args.seed)
+            print(f"🧪 已生成 {students} 人合成成绩表（{time.perf_counter() - start:.1f}s）：{path}")
+
+            run = bench_isolated(path, workers=args.workers, trace_memory=args.trace_memory)
+            run['requested_students'] = students
+            run['input_mb'] = round(os.path.getsize(path) / (1024 * 1024), 2)
+            report['runs'].append(run)
+
+            print(f"⏱️ {students} 人：共 {run['total_seconds']}s，{run['rows_per_sec']} 行/秒，峰值内存 {run['peak_rss_mb']} MB")
+            for name, stage in run['stages'].items():
+                mem = f"，分配峰值 {stage['peak_alloc_mb']} MB" if 'peak_alloc_mb' in stage else ''
+                print(f"   {name:<18}{stage['seconds']:>9.3f}s{mem}")
+    finally:
+        if args.keep_input:
+            print(f"📁 合成成绩表保留在：{work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not args.imports_only:
+        report['parse_time'] = bench_parse_time(seed=args.seed)
+        print(f"⏱️ parse_time 逐格 {report['parse_time']['parse_time_seconds']}s，"
+              f"整列 {report['parse_time']['parse_time_series_seconds']}s（{report['parse_time']['values']} 个值）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存：{args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+    # 导入耗时超出预算时以非零状态退出，便于在 CI 中拦截
+    over = [module for module, result in report['imports'].items() if result['over_budget'] or result['loaded']]
+    if over:
+        print(f"⚠️ 导入耗时超出预算或提前加载了 {'、'.join(DEFERRED_MODULES)}：{'、'.join(over)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
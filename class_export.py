@@ -0,0 +1,146 @@
+# class_export.py
+# 分班结果导出：按班级拆分总表，用进程池并行写出各班 Excel，
+# 单个班级失败只记录原因、不影响其他班级，可选打包成一个 zip 供一次性下载。
+
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from excel_writer import LazyWorkbook, write_styled_excel
+
+def default_workers():
+    """并行写文件的进程数：环境变量 SCORING_EXPORT_WORKERS 优先，否则为 CPU 核数。"""
+    env = os.environ.get('SCORING_EXPORT_WORKERS')
+    if env:
+        try:
+            return max(1, int(env))
+        except ValueError:
+            print(f"⚠️ SCORING_EXPORT_WORKERS={env} 不是整数，改用 CPU 核数")
+    return os.cpu_count() or 1
+
+def safe_file_name(class_name):
+    return "".join(c if c.isalnum() or c in "_-" else "_" for c in str(class_name))
+
+def class_file_name(class_name, timestamp):
+    return f"{safe_file_name(class_name)}_评分结果_{timestamp}.xlsx"
+
+def class_frames(final_result, columns):
+    """按“班级”拆分总表，逐个产出 (班级, 只含 columns 列的 DataFrame)。"""
+    for class_name, class_df in final_result.groupby('班级'):
+        class_df = class_df.copy()
+        for col in columns:
+            if col not in class_df.columns:
+                class_df[col] = ""
+        yield class_name, class_df[columns]
+
+def _write_class_file(class_name, class_df, file_path):
+    """写出单个班级文件，返回一条导出记录；异常不外抛。"""
+    start = time.perf_counter()
+    try:
+        write_styled_excel(class_df, file_path)
+        error = None
+    except Exception as e:
+        error = str(e)
+    return {'班级': class_name, '文件': file_path, '耗时': time.perf_counter() - start, '错误': error}
+
+def _no_progress(fraction, message):
+    pass
+
+def _report(progress, records, total):
+    progress(len(records) / total, f"已导出分班表 {len(records)}/{total}：{records[-1]['班级']}")
+
+def _run_parallel(jobs, workers, progress):
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_write_class_file, *job): job for job in jobs}
+        for future in as_completed(futures):
+            class_name, _, file_path = futures[future]
+            try:
+                records.append(future.result())
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                records.append({'班级': class_name, '文件': file_path, '耗时': 0.0, '错误': str(e)})
+            _report(progress, records, len(jobs))
+    return records
+
+def export_class_files(final_result, columns, timestamp, output_dir=None, workers=None, make_zip=False,
+                       progress=None):
+    """
+    按“班级”分组写出分班评分文件（output_dir 为空时写到当前目录）。
+    workers 为并行进程数（默认见 default_workers，<=1 时在当前进程顺序写出）。
+    progress(完成比例, 说明) 在每个班级文件写完后调用。
+    返回 (导出记录列表, zip 路径或 None)；每条记录含 班级/文件/耗时(秒)/错误(成功为 None)。
+    """
+    progress = progress or _no_progress
+    jobs = [(class_name, class_df, os.path.join(output_dir or '', class_file_name(class_name, timestamp)))
+            for class_name, class_df in class_frames(final_result, columns)]
+
+    workers = default_workers() if workers is None else workers
+    workers = min(workers, len(jobs))
+    records = None
+    if workers > 1:
+        try:
+            records = _run_parallel(jobs, workers, progress)
+        except (BrokenProcessPool, OSError) as e:
+            # 进程池不可用（受限环境等）时退回顺序写出
+            print(f"⚠️ 并行导出不可用，改为顺序导出：{e}")
+    if records is None:
+        records = []
+        for job in jobs:
+            records.append(_write_class_file(*job))
+            _report(progress, records, len(jobs))
+
+    order = {job[2]: i for i, job in enumerate(jobs)}
+    records.sort(key=lambda r: order[r['文件']])
+    for record in records:
+        if record['错误'] is None:
+            print(f"✅ 分班表已保存：{record['文件']}（{record['耗时']:.2f}s）")
+        else:
+            print(f"❌ 分班表导出失败：{record['班级']}，{record['错误']}")
+
+    zip_path = None
+    if make_zip:
+        zip_path = os.path.join(output_dir or '', f"分班_评分结果_{timestamp}.zip")
+        # xlsx 本身已压缩，直接存储即可
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zf:
+            for record in records:
+                if record['错误'] is None:
+                    zf.write(record['文件'], arcname=os.path.basename(record['文件']))
+        print(f"📦 分班文件已打包：{zip_path}")
+
+    return records, zip_path
+
+def lazy_class_workbooks(final_result, columns, timestamp):
+    """内存模式下的分班文件：每个班级一个 LazyWorkbook，下载时才生成。"""
+    return [LazyWorkbook(class_df, class_file_name(class_name, timestamp))
+            for class_name, class_df in class_frames(final_result, columns)]
+
+class LazyZip:
+    """按需生成的分班 zip：第一次取字节时才生成所有分班表并打包。"""
+
+    def __init__(self, workbooks, file_name):
+        self.workbooks = workbooks
+        self.file_name = file_name
+        self.build_seconds = None
+        self._data = None
+
+    @property
+    def ready(self):
+        return self._data is not None
+
+    def getvalue(self, progress=None):
+        """progress(完成比例, 说明) 在每个分班表生成后调用。"""
+        if self._data is None:
+            progress = progress or _no_progress
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+                for i, workbook in enumerate(self.workbooks, start=1):
+                    zf.writestr(workbook.file_name, workbook.getvalue())
+                    progress(i / len(self.workbooks), f"已生成分班表 {i}/{len(self.workbooks)}：{workbook.file_name}")
+            self._data = buffer.getvalue()
+            self.build_seconds = time.perf_counter() - start
+        return self._data
@@ -0,0 +1,82 @@
+# cohort_stats.py
+# 评分结果的统计和排名：按班级、性别和全体计算各项目均分、及格率（≥60 分）、平均分分布，
+# 以及每名学生的班内排名、年级排名和年级百分位。全部在总表 DataFrame 上分组一次算出，
+# 作为总表的附加工作表写出，并随评分结果一起缓存，不再需要导出后另外手工统计。
+
+import numpy as np
+import pandas as pd
+
+PASS_SCORE = 60
+# 平均分分布的分段（左闭右开）
+HISTOGRAM_EDGES = [-np.inf, 60, 70, 80, 90, np.inf]
+HISTOGRAM_LABELS = ['60分以下', '60-69分', '70-79分', '80-89分', '90分及以上']
+
+SUMMARY_SHEET = '统计汇总'
+RANK_SHEET = '排名'
+RANK_COLUMNS = ['序号', '班级', '学号', '姓名', '性别', '总分', '平均分', '班内排名', '年级排名', '年级百分位']
+
+def _stat_fields(final_result):
+    """参与统计的数值列：各项得分、总分和平均分。"""
+    return [c for c in final_result.columns if c.endswith('_得分')] + ['总分', '平均分']
+
+def _display_name(col):
+    return col[:-len('_得分')] if col.endswith('_得分') else col
+
+def _indicator_frame(final_result):
+    """
+    每名学生一行的统计用数值表：各项得分（均分用）、是否及格（有得分时为 0/1，无得分为 NaN，及格率用）
+    和平均分所在分段（0/1，分布用）。列名即汇总表中的列名。
+    """
+    fields = _stat_fields(final_result)
+    # float32 得分先还原为两位小数的原值
+    values = final_result[fields].astype('float64').round(2)
+    means = values.rename(columns=lambda c: f"{_display_name(c)}_均分")
+    rated = [c for c in fields if c != '总分']
+    passed = (values[rated] >= PASS_SCORE).astype('float64').where(values[rated].notna()) * 100
+    passed = passed.rename(columns=lambda c: f"{_display_name(c)}_及格率(%)")
+    bins = pd.cut(values['平均分'], HISTOGRAM_EDGES, right=False, labels=HISTOGRAM_LABELS)
+    histogram = pd.get_dummies(bins).astype('int64').reindex(columns=HISTOGRAM_LABELS, fill_value=0)
+    histogram.index = values.index
+    return means, passed, histogram
+
+def _summarize(means, passed, histogram, keys):
+    """按 keys 分组汇总：人数、均分、及格率、分布人数。"""
+    grouped = [frame.groupby(keys, sort=True) for frame in (means, passed, histogram)]
+    return pd.concat([
+        grouped[0].size().rename('人数'),
+        grouped[0].mean().round(2),
+        grouped[1].mean().round(1),
+        grouped[2].sum(),
+    ], axis=1)
+
+def summary_table(final_result):
+    """
+    班级、性别和全体的汇总表，每组一行：分组（班级/性别/全体）、名称、人数，
+    各项目和总分、平均分的均分，各项目和平均分的及格率（只计有得分的学生），平均分各分段的人数。
+    """
+    means, passed, histogram = _indicator_frame(final_result)
+    parts = []
+    for kind, keys in [('班级', final_result['班级'].astype(object)), ('性别', final_result['性别'].astype(object)),
+                       ('全体', pd.Series('全体', index=final_result.index))]:
+        summary = _summarize(means, passed, histogram, keys)
+        summary.insert(0, '名称', summary.index)
+        summary.insert(0, '分组', kind)
+        parts.append(summary.reset_index(drop=True))
+    return pd.concat(parts, ignore_index=True)
+
+def student_ranks(final_result):
+    """
+    每名学生按平均分的排名（总表顺序）：班内排名和年级排名为并列取最小名次，
+    年级百分位为平均分不高于该生的学生所占百分比；没有平均分的学生不参与排名。
+    """
+    average = final_result['平均分'].astype('float64')
+    classes = final_result['班级'].astype(object)
+    ranks = final_result[RANK_COLUMNS[:7]].copy()
+    ranks['班内排名'] = average.groupby(classes).rank(method='min', ascending=False).astype('Int64')
+    ranks['年级排名'] = average.rank(method='min', ascending=False).astype('Int64')
+    ranks['年级百分位'] = (average.rank(method='max', pct=True) * 100).round(1)
+    return ranks
+
+def cohort_stats(final_result):
+    """总表的统计工作表 {工作表名: DataFrame}：统计汇总和排名，可直接作为 write_styled_excel 的 extra_sheets。"""
+    return {SUMMARY_SHEET: summary_table(final_result), RANK_SHEET: student_ranks(final_result)}
@@ -0,0 +1,106 @@
+# columnar.py
+# 列式格式的输入输出：总表可以另外导出为 Parquet 或 Arrow IPC（Feather v2）文件，得分列为数值类型，
+# 便于分析时大批量读取；评分输入也可以是 CSV 或 Parquet 表格，不经过 xlsx 解析。
+# Parquet/Arrow 依赖 pyarrow（Streamlit 已自带），未安装时只影响这两种格式。
+
+import csv
+import os
+import re
+import numpy as np
+import pandas as pd
+from excel_reader import _convert_cell
+
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+TABLE_INPUTS = ('.csv', '.parquet')
+
+# CSV 单元格中按数值读取的写法（与在 Excel 中打开 CSV 时一致）；其余保持文本
+_CSV_NUMBER_RE = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$')
+
+def is_table_input(file_path):
+    """file_path 是否为 CSV/Parquet 表格输入（文件对象一律按 xlsx 处理）。"""
+    return isinstance(file_path, str) and file_path.lower().endswith(TABLE_INPUTS)
+
+def _csv_cell(text):
+    text = text.strip()
+    if _CSV_NUMBER_RE.match(text):
+        return _convert_cell(float(text))
+    return _convert_cell(text)
+
+def _trim(row):
+    while row and not isinstance(row[-1], str) and pd.isna(row[-1]):
+        row.pop()
+    return row
+
+def _read_csv_rows(file_path):
+    # 老师从 Excel 另存的 CSV 常见 UTF-8（带 BOM）和 GBK 两种编码
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            with open(file_path, encoding=encoding, newline='') as f:
+                return [_trim([_csv_cell(v) for v in row]) for row in csv.reader(f)]
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"无法识别 CSV 文件编码：{file_path}")
+
+def _parquet_cell(val):
+    if val is None or val is pd.NA or (isinstance(val, float) and np.isnan(val)):
+        return np.nan
+    return _convert_cell(val)
+
+def read_table_rows(file_path):
+    """
+    把 CSV/Parquet 表格读成与 excel_reader.read_sheets 中单个工作表相同的逐行数据，供 scan_segments 切段：
+    CSV 按行原样读取（可以像成绩表一样包含标题行和多个表头段落）；Parquet 的列名作为唯一的表头行。
+    """
+    if file_path.lower().endswith('.csv'):
+        return _read_csv_rows(file_path)
+    table = pd.read_parquet(file_path)
+    rows = [[str(c) for c in table.columns]]
+    rows.extend(_trim([_parquet_cell(v) for v in row]) for row in table.itertuples(index=False, name=None))
+    return rows
+
+def typed_result(final_result, table):
+    """
+    总表转为列式存储用的类型，列与导出的 Excel 总表 table（display_result 的结果）相同：数值列直接取内部总表
+    final_result，得分、总分、平均分为 float64（无得分为 NaN，得分保留两位小数），序号为可空整数；
+    其余列（班级、学号、原始成绩、备注等）取 table 中的值，为字符串，空单元格为缺失值。
+    """
+    table = table.reset_index(drop=True)
+    typed = pd.DataFrame(index=range(len(table)))
+    for col in table.columns:
+        if col.endswith('_得分'):
+            typed[col] = np.round(final_result[col].to_numpy(dtype='float64'), 2)
+        elif col in ('总分', '平均分'):
+            typed[col] = final_result[col].to_numpy(dtype='float64')
+        elif col == '序号':
+            typed[col] = pd.array(final_result[col].to_numpy(), dtype='Int64')
+        else:
+            values = table[col]
+            typed[col] = values.where(values.notna() & (values != ''), None).astype('string')
+    return typed
+
+def require_columnar(fmt):
+    """检查列式格式名和 pyarrow 是否可用，评分前调用，避免写完 Excel 后才失败。"""
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"不支持的列式格式：{fmt}（可选 {', '.join(COLUMNAR_FORMATS)}）")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"导出 {fmt} 格式需要安装 pyarrow：pip install pyarrow") from None
+
+def write_columnar(final_result, table, file_path, fmt='parquet'):
+    """把总表（内部总表及其导出表 table）以 fmt（parquet 或 arrow）格式写到 file_path，返回写出的路径。"""
+    require_columnar(fmt)
+    typed = typed_result(final_result, table)
+    if fmt == 'parquet':
+        typed.to_parquet(file_path, index=False)
+    else:
+        typed.to_feather(file_path)
+    return file_path
+
+def columnar_file_name(timestamp, fmt):
+    return f"总表_评分结果_{timestamp}{COLUMNAR_FORMATS[fmt]}"
+
+def input_suffix(file_name):
+    """上传文件应保存的扩展名（.xlsx/.csv/.parquet）。"""
+    ext = os.path.splitext(file_name)[1].lower()
+    return ext if ext in TABLE_INPUTS else '.xlsx'
@@ -0,0 +1,134 @@
+# excel_reader.py
+# 流式读取原始成绩表：用 openpyxl 只读模式逐行扫描所有可见工作表，边读边识别“性别”表头行，
+# 每读完一个段落就交给评分，内存峰值只与最大的段落有关，而不是整个工作簿。
+# 表头识别只检查文本单元格，“性 别”“性　别”等带空格的写法也算表头；段落不跨工作表。
+# 表头中的别名（“跳绳(1分钟)”“1000米”等）由 header_aliases 统一为标准列名。
+
+import numpy as np
+import pandas as pd
+from header_aliases import resolve_header
+
+# Excel 错误值（与 openpyxl.cell.cell.ERROR_CODES 相同）；openpyxl 在打开工作簿时才导入
+ERROR_CODES = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+
+# 与 pd.read_excel 默认一致的缺失值写法
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+def _convert_cell(val):
+    """单元格取值规则与 pd.read_excel 一致：空值/错误值为 NaN，整数值的浮点数转为 int。"""
+    if val is None:
+        return np.nan
+    if isinstance(val, str):
+        return np.nan if val in NA_STRINGS or val in ERROR_CODES else val
+    if isinstance(val, float) and val.is_integer():
+        return int(val)
+    return val
+
+def normalize_header(value):
+    """表头单元格的规范写法：文本去掉所有空白（含全角空格和换行），其余取值不变。"""
+    if isinstance(value, str):
+        return ''.join(value.split())
+    return value
+
+def is_header_row(row, keyword='性别'):
+    """行中是否有文本单元格（去掉空白后）包含 keyword；数值、日期和空单元格不参与判断。"""
+    first = keyword[0]
+    for v in row:
+        if isinstance(v, str) and first in v and keyword in ''.join(v.split()):
+            return True
+    return False
+
+def _make_segment(header, rows):
+    """把表头行和数据行拼成以表头为列名的 DataFrame，行宽不一时补 NaN。"""
+    width = max([len(header)] + [len(row) for row in rows])
+    columns = header + [np.nan] * (width - len(header))
+    data = [row + [np.nan] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(data, columns=range(width), dtype=object)
+    df.columns = pd.Index(columns, dtype=object)
+    return df
+
+def _worksheet_rows(ws):
+    for values in ws.iter_rows(values_only=True):
+        row = [_convert_cell(v) for v in values]
+        while row and not isinstance(row[-1], str) and pd.isna(row[-1]):
+            row.pop()
+        yield row
+
+def read_sheets(file_path):
+    """
+    逐个产出可见工作表的 (表名, 行迭代器)，每行为转换后的单元格值列表（已去掉行尾空单元格）。
+    行迭代器需在取下一个工作表之前读完。
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            if ws.sheet_state == 'visible':
+                # 只读模式默认按文件中记录的维度（<dimension>）读取，有些程序写出的维度不完整（如只有 A1），
+                # 与 pd.read_excel 一样先清除维度，按实际存在的行列读取
+                ws.reset_dimensions()
+                yield ws.title, _worksheet_rows(ws)
+    finally:
+        wb.close()
+
+def sheet_rows(file_path):
+    """
+    各可见工作表记录的行数之和，只用于估算进度（取自文件中记录的维度信息，不扫描数据）。
+    维度信息不可靠：没有记录或只记录了一行（如维度为 A1）的工作表无法估算，此时返回 None。
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        counts = [ws.max_row for ws in wb.worksheets if ws.sheet_state == 'visible']
+        return sum(counts) if all(c is not None and c > 1 for c in counts) else None
+    finally:
+        wb.close()
+
+def scan_segments(rows, keyword='性别', sheet=None):
+    """
+    单次扫描逐行数据，切出段落：is_header_row 的行为表头行，该行到下一个表头行之前的所有行为一个段落
+    （第一个表头之前的标题行丢弃）。产出 (段落信息, 表头, 数据行列表)，段落信息为 dict：
+      sheet（工作表名）/ header_row / first_row / last_row（行号从 1 起，无数据行时 last_row 等于 header_row）/
+      columns（规范化后的列名 -> 列下标，同名列取第一个）/ aliases（应用的表头别名 [(原写法, 标准列名)]）/
+      unsupported（评分标准不支持的项目列 [原写法]，这些列不评分）
+    表头中的文本按 normalize_header 去掉空白，再按 resolve_header 把别名替换为标准列名。
+    """
+    header, aliases, unsupported, data, header_row = None, [], [], [], 0
+
+    def segment():
+        columns = {}
+        for i, name in enumerate(header):
+            if not (isinstance(name, float) and np.isnan(name)):
+                columns.setdefault(name, i)
+        info = {'sheet': sheet, 'header_row': header_row, 'first_row': header_row + 1,
+                'last_row': header_row + len(data), 'columns': columns, 'aliases': aliases,
+                'unsupported': unsupported}
+        return info, header, data
+
+    for number, row in enumerate(rows, start=1):
+        if is_header_row(row, keyword):
+            if header is not None:
+                yield segment()
+            header, aliases, unsupported = resolve_header([normalize_header(v) for v in row])
+            data, header_row = [], number
+        elif header is not None:
+            data.append(row)
+    if header is not None:
+        yield segment()
+
+def sheet_segments(sheets, keyword='性别'):
+    """对 read_sheets 产出的每个工作表依次切段，产出 (段落信息, 以表头为列名的段落 DataFrame)。"""
+    for sheet, rows in sheets:
+        for info, header, data in scan_segments(rows, keyword, sheet):
+            yield info, _make_segment(header, data)
+
+def iter_segments(file_path, keyword='性别'):
+    """
+    流式逐段产出所有可见工作表中的原始表格，每个段落以表头为列名、所有列为 object 类型，
+    与 pd.read_excel(header=None) 切片得到的数据一致。
+    """
+    for _, df in sheet_segments(read_sheets(file_path), keyword):
+        yield df
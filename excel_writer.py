@@ -0,0 +1,152 @@
+# excel_writer.py
+# 一次写出带格式的评分结果：表头加粗、单元格居中加细边框、列宽按内存中的数据计算，
+# 不再先 to_excel 再重新打开文件逐格美化。
+# 安装了 xlsxwriter 时用它流式写出（明显快于 openpyxl），否则用 openpyxl 只写模式。
+# 两个库都在第一次写文件时才导入，只导入评分模块（例如页面启动时）不加载它们。
+
+import datetime
+import importlib.util
+import io
+import time
+
+HAS_XLSXWRITER = importlib.util.find_spec('xlsxwriter') is not None
+
+# 日期/时间单元格的显示格式（与 pandas to_excel 一致）
+DATETIME_FORMATS = [
+    (datetime.datetime, 'yyyy-mm-dd hh:mm:ss'),
+    (datetime.date, 'yyyy-mm-dd'),
+    (datetime.time, 'hh:mm:ss'),
+]
+TEMPORAL_TYPES = tuple(t for t, _ in DATETIME_FORMATS)
+
+HEADER_STYLE_NAME = '评分表头'
+CELL_STYLE_NAME = '评分单元格'
+
+def _register_styles(wb):
+    """在工作簿中登记表头/单元格两个命名样式，所有单元格只引用样式名。"""
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal='center', vertical='center')
+    wb.add_named_style(NamedStyle(name=HEADER_STYLE_NAME, font=Font(bold=True), border=border, alignment=center))
+    wb.add_named_style(NamedStyle(name=CELL_STYLE_NAME, border=border, alignment=center))
+
+def _styled_cell(ws, value, style_name):
+    from openpyxl.cell import WriteOnlyCell
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style_name
+    if isinstance(value, TEMPORAL_TYPES):
+        # 命名样式的数字格式为常规，日期/时间需要重新设置，否则显示为序列数
+        cell.number_format = next(fmt for t, fmt in DATETIME_FORMATS if isinstance(value, t))
+    return cell
+
+def column_widths(headers, rows):
+    """列宽 = 该列（含表头）最长文本长度 + 2；空单元格按 str(None) 计，与原先逐格美化时一致（最小列宽为 6）。"""
+    widths = [len(str(h)) for h in headers]
+    for row in rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(str(value)))
+    return [w + 2 for w in widths]
+
+def temporal_columns(rows):
+    """含日期/时间取值（例如 Excel 中输入为 4:20 的成绩）的列下标。"""
+    columns = set()
+    for row in rows:
+        for i, value in enumerate(row):
+            if isinstance(value, TEMPORAL_TYPES):
+                columns.add(i)
+    return sorted(columns)
+
+def frame_rows(df):
+    """DataFrame 转为逐行的 Python 值列表，NaN/None 统一为 None（写出为空单元格）。"""
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+def _write_openpyxl(sheets, file_path):
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+    for sheet_name, headers, rows, widths in sheets:
+        ws = wb.create_sheet(title=sheet_name)
+        for i, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(i)].width = width
+
+        ws.append([_styled_cell(ws, h, HEADER_STYLE_NAME) for h in headers])
+        for row in rows:
+            ws.append([_styled_cell(ws, v, CELL_STYLE_NAME) for v in row])
+    wb.save(file_path)
+
+def _write_xlsxwriter(sheets, file_path):
+    import xlsxwriter
+    in_memory = not isinstance(file_path, str)
+    wb = xlsxwriter.Workbook(file_path, {
+        'constant_memory': not in_memory,
+        'in_memory': in_memory,
+        # 原样写出文本，不把 “=”、网址等自动转成公式或超链接
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'nan_inf_to_errors': True,
+    })
+    header_format = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+    cell_format = wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter'})
+    # write_row 只能用一个格式，日期/时间单元格不带数字格式会显示为序列数，单独用带格式的样式重写
+    temporal_formats = [(t, wb.add_format({'border': 1, 'align': 'center', 'valign': 'vcenter', 'num_format': fmt}))
+                        for t, fmt in DATETIME_FORMATS]
+    # constant_memory 模式下逐个工作表按行顺序写完（同一行内可以重写单元格）
+    for sheet_name, headers, rows, widths in sheets:
+        ws = wb.add_worksheet(sheet_name)
+        for i, width in enumerate(widths):
+            ws.set_column(i, i, width)
+
+        temporal = temporal_columns(rows)
+        ws.write_row(0, 0, headers, header_format)
+        for r, row in enumerate(rows, start=1):
+            ws.write_row(r, 0, row, cell_format)
+            for i in temporal:
+                value = row[i]
+                if isinstance(value, TEMPORAL_TYPES):
+                    fmt = next(f for t, f in temporal_formats if isinstance(value, t))
+                    ws.write_datetime(r, i, value, fmt)
+    wb.close()
+
+def _sheet_data(sheet_name, df):
+    headers = [str(c) for c in df.columns]
+    rows = frame_rows(df)
+    return sheet_name, headers, rows, column_widths(headers, rows)
+
+def write_styled_excel(df, file_path, sheet_name='Sheet1', extra_sheets=None):
+    """
+    单次写出带格式的 Excel：列宽在写入前由内存中的 df 算出，
+    所有单元格共享工作簿内的同一组样式（表头、普通单元格各一个）。
+    file_path 可以是路径，也可以是 BytesIO 等文件对象。
+    extra_sheets 为 {工作表名: DataFrame}，按顺序写在 df 所在工作表之后，格式相同。
+    """
+    sheets = [_sheet_data(sheet_name, df)]
+    sheets.extend(_sheet_data(name, extra) for name, extra in (extra_sheets or {}).items())
+    if HAS_XLSXWRITER:
+        _write_xlsxwriter(sheets, file_path)
+    else:
+        _write_openpyxl(sheets, file_path)
+
+class LazyWorkbook:
+    """按需生成的内存 Excel：第一次取字节时才写出，之后复用同一份结果。"""
+
+    def __init__(self, df, file_name, extra_sheets=None):
+        self.df = df
+        self.file_name = file_name
+        self.extra_sheets = extra_sheets
+        self.build_seconds = None  # 生成耗时，未生成时为 None
+        self._data = None
+
+    @property
+    def ready(self):
+        return self._data is not None
+
+    def getvalue(self):
+        if self._data is None:
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            write_styled_excel(self.df, buffer, extra_sheets=self.extra_sheets)
+            self._data = buffer.getvalue()
+            self.build_seconds = time.perf_counter() - start
+        return self._data
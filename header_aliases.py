@@ -0,0 +1,95 @@
+# header_aliases.py
+# 表头别名：把老师常写的表头变体（“跳绳(1分钟)”“１００米”“实心球”“性 别”等）统一为评分使用的标准列名。
+# 每个写法先规范化为比较键（全角转半角、去掉空白和括号中的说明、“m”写作“米”等），再查别名索引；
+# 同一表头（各列取值完全相同）的映射结果缓存在进程内，重复的段落和文件直接复用。
+# 别名只收同一项目的不同写法；1000米、50米等评分标准中没有的项目不映射到相近项目，只作为不支持的项目报告。
+
+import hashlib
+import re
+import unicodedata
+from functools import lru_cache
+
+# 标准列名 -> 常见写法（标准列名本身不用列出；只差空白、全角字符、括号说明的写法也不用列出）
+HEADER_ALIASES = {
+    '序号': ['编号', 'no', '序'],
+    '班级': ['班别', '班', '所在班级', '行政班'],
+    '学号': ['学籍号', '考号', '准考证号'],
+    '性别': [],
+    '姓名': ['学生姓名', '名字'],
+    '引体向上': ['引体'],
+    '仰卧起坐': ['1分钟仰卧起坐', '仰卧卷腹'],
+    '仰卧起坐/引体向上': ['引体向上/仰卧起坐', '引体/仰卧起坐', '仰卧起坐/引体'],
+    '1500米': ['1500米跑'],
+    '800米': ['800米跑'],
+    '800米/1500米': ['1500米/800米', '800/1500米'],
+    '1分钟跳绳': ['跳绳', '1分跳绳', '跳绳1分钟'],
+    '立定跳远': ['跳远'],
+    '抛实心球': ['实心球', '掷实心球', '投掷实心球', '前抛实心球'],
+    '100米': ['100米跑', '百米'],
+    '备注': ['说明'],
+}
+
+# 评分标准不支持的常见测试项目：不评分，在段落中出现时提示
+UNSUPPORTED_EVENTS = ['1000米', '1000米跑', '1000米/800米', '800米/1000米', '50米', '50米跑', '50米×8往返跑', '坐位体前屈']
+
+BRACKETS = re.compile(r'\(.*?\)|\[.*?\]|【.*?】|〔.*?〕')
+METER_UNIT = re.compile(r'(\d)(?:m|公尺)(?![a-z])')
+PUNCTUATION = re.compile(r'[·.,，、_\-:：*]')
+
+def header_key(name):
+    """
+    表头写法的比较键：全角转半角、小写，去掉括号中的说明（只有括号时保留括号内容）、空白和标点，
+    数字后的“m”“公尺”写作“米”，“一分钟”写作“1分钟”。
+    """
+    text = unicodedata.normalize('NFKC', name).lower()
+    text = BRACKETS.sub('', text) or text
+    text = ''.join(text.split())
+    text = METER_UNIT.sub(r'\1米', text)
+    text = text.replace('一分钟', '1分钟')
+    return PUNCTUATION.sub('', text)
+
+def _alias_index():
+    index = {}
+    for canonical, aliases in HEADER_ALIASES.items():
+        for name in [canonical] + aliases:
+            index.setdefault(header_key(name), canonical)
+    return index
+
+ALIAS_INDEX = _alias_index()
+UNSUPPORTED_KEYS = {header_key(name) for name in UNSUPPORTED_EVENTS}
+
+# 别名表的指纹，别名或不支持的项目有任何改动都会变化（同一文件的评分结果随之改变，用于结果缓存的键）
+ALIASES_VERSION = hashlib.sha256(repr((HEADER_ALIASES, UNSUPPORTED_EVENTS)).encode('utf-8')).hexdigest()[:16]
+
+@lru_cache(maxsize=1024)
+def _resolve(signature):
+    header = list(signature)
+    taken = {name for name in header if name in HEADER_ALIASES}
+    applied, unsupported = [], []
+    for i, name in enumerate(header):
+        if not isinstance(name, str) or name in HEADER_ALIASES:
+            continue
+        key = header_key(name)
+        if key in UNSUPPORTED_KEYS:
+            unsupported.append(name)
+            continue
+        canonical = ALIAS_INDEX.get(key)
+        # 表中已经有标准列（或前面的列已映射到它）时不再覆盖
+        if canonical is None or canonical in taken:
+            continue
+        header[i] = canonical
+        taken.add(canonical)
+        applied.append((name, canonical))
+    return tuple(header), tuple(applied), tuple(unsupported)
+
+def resolve_header(header):
+    """
+    把表头中的别名替换为标准列名，返回 (新表头列表, 应用的别名 [(原写法, 标准列名)], 不支持的项目列 [原写法])。
+    已是标准列名的列和无法识别的列保持不变；多个列对应同一标准列名时只映射第一个。
+    """
+    resolved, applied, unsupported = _resolve(tuple(header))
+    return list(resolved), list(applied), list(unsupported)
+
+def format_aliases(aliases):
+    """别名列表的说明文字，例如“跳绳(1分钟)→1分钟跳绳、实心球→抛实心球”。"""
+    return '、'.join(f"{name}→{canonical}" for name, canonical in aliases)
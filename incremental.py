@@ -0,0 +1,289 @@
+# incremental.py
+# 增量评分：老师改了几个错字后重新上传同一份成绩表时，只重新评分原始数据有变动的行，
+# 只重写内容有变动的分班文件，未变动的分班文件原样保留；同时按（班级, 学号, 姓名）给出
+# 新增、删除、修改学生的变动报告。上一次的评分状态（总表、每行原始数据指纹、各文件名）保存在输出目录中。
+
+import hashlib
+import os
+import zipfile
+from datetime import datetime
+import pandas as pd
+from class_export import class_frames, export_class_files
+from cohort_stats import cohort_stats
+from columnar import columnar_file_name, require_columnar, write_columnar
+from excel_reader import sheet_segments
+from excel_writer import frame_rows, write_styled_excel
+from metrics import RunMetrics
+from rule_registry import get_rules
+from scoring_script import (RESULT_COLUMNS, SEGMENT_RESULT_COLUMNS, STANDARD_COLUMNS, combine_results, display_result,
+                            input_sheets, report_aliases, score_valid_rows, segment_label, valid_segment_rows)
+
+STATE_NAME = 'incremental_state.pkl'
+KEY_COLUMNS = ['班级', '学号', '姓名']
+# 变动报告中逐列比较的列（原始成绩、得分和备注）
+COMPARE_COLUMNS = [c for c in STANDARD_COLUMNS if c not in ['序号'] + KEY_COLUMNS]
+
+def row_fingerprints(df):
+    """每行原始数据连同所在段落表头的指纹：表头或任一单元格（包括取值类型）不同，指纹就不同。"""
+    header = repr(list(df.columns))
+    return [hashlib.sha1(f"{header}|{row!r}".encode('utf-8')).hexdigest()
+            for row in df.itertuples(index=False, name=None)]
+
+def load_state(output_dir):
+    """读取 output_dir 中上次的评分状态；没有或已损坏时返回 None（按首次评分处理）。"""
+    path = os.path.join(output_dir, STATE_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        state = pd.read_pickle(path)
+    except Exception as e:
+        print(f"⚠️ 增量评分状态损坏，改为全量评分：{e}")
+        return None
+    if not set(RESULT_COLUMNS) <= set(state['final_result'].columns):
+        print("⚠️ 增量评分状态为旧版格式，改为全量评分")
+        return None
+    return state
+
+def save_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_NAME)
+    pd.to_pickle(state, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def _merge_segment(rows, previous_result, taken, changed, rules):
+    """把复用的上次结果行和重新评分的行按原顺序拼成段落结果，列与全量评分该段落时一致。"""
+    present = set(rows.columns) | set(SEGMENT_RESULT_COLUMNS) | {'序号'}
+    columns = [c for c in RESULT_COLUMNS if c in present]
+    result = pd.DataFrame(index=range(len(rows)), columns=columns, dtype=object)
+    reused = [i for i, t in enumerate(taken) if t is not None]
+    result.iloc[reused] = previous_result.iloc[[taken[i] for i in reused]][columns].to_numpy(dtype=object)
+    if changed:
+        result.iloc[changed] = score_valid_rows(rows.iloc[changed], rules)[columns].to_numpy(dtype=object)
+    result['序号'] = range(1, len(result) + 1)
+    return result
+
+def score_workbook_incremental(file_path, state=None, metrics=None, rules=None):
+    """
+    与 score_workbook 结果相同，但原始数据（含段落表头）与上次完全相同的行直接复用上次的评分结果；
+    评分标准 rules（RuleSet，默认为内置标准）与上次的规则版本不同时全部重新评分。
+    返回 (总表 DataFrame 或 None, 每行指纹列表, 重新评分的行数)。
+    """
+    metrics = metrics or RunMetrics()
+    rules = rules or get_rules()
+    previous = {}
+    if state is not None and state['rules_version'] == rules.version:
+        for i, fp in enumerate(state['fingerprints']):
+            previous.setdefault(fp, []).append(i)
+
+    all_results, fingerprints = [], []
+    rescored = 0
+    segment_count = 0
+    # 增量模式下读取和段落识别合计在 read 阶段
+    sheets, _ = input_sheets(file_path)
+    for info, df in metrics.timed('read', sheet_segments(sheets)):
+        segment_count += 1
+        print(f"🔍 识别到第 {segment_count} 个表头段落（{segment_label(info)}）")
+        report_aliases(info, metrics)
+        with metrics.stage('scoring'):
+            rows = valid_segment_rows(df)
+            if rows is None:
+                continue
+            fps = row_fingerprints(rows)
+            # 同一指纹出现多次时按顺序一一对应
+            taken = [previous[fp].pop(0) if previous.get(fp) else None for fp in fps]
+            changed = [i for i, t in enumerate(taken) if t is None]
+            if len(changed) == len(rows):
+                result = score_valid_rows(rows, rules)
+            else:
+                result = _merge_segment(rows, state['final_result'], taken, changed, rules)
+        rescored += len(changed)
+        fingerprints.extend(fps)
+        all_results.append(result)
+
+    print(f"🔍 共识别到 {segment_count} 个表头段落，重新评分 {rescored} 行")
+    if not all_results:
+        print("❌ 没有有效数据段落，评分失败")
+        return None, [], 0
+
+    with metrics.stage('combine'):
+        return combine_results(all_results), fingerprints, rescored
+
+def _student_key(values):
+    return tuple(None if pd.isna(v) else v for v in values)
+
+def _group_rows(result, fingerprints):
+    """(班级, 学号, 姓名) -> [(行号, 指纹)]，保持出现顺序。"""
+    groups = {}
+    keys = result[KEY_COLUMNS].itertuples(index=False, name=None)
+    for i, (key, fp) in enumerate(zip(keys, fingerprints)):
+        groups.setdefault(_student_key(key), []).append((i, fp))
+    return groups
+
+def _changed_columns(old_row, new_row):
+    changed = []
+    for col in COMPARE_COLUMNS:
+        old, new = old_row[col], new_row[col]
+        if not (old == new or (pd.isna(old) and pd.isna(new))) or type(old) is not type(new):
+            changed.append(col)
+    return changed
+
+def change_report(state, old_table, table, fingerprints):
+    """
+    按（班级, 学号, 姓名）对比上次与本次的导出表（display_result 的结果），返回变动报告 DataFrame，列为
+    变动（新增/删除/修改）、班级、学号、姓名、变动项（修改时列出取值变化的列）。
+    """
+    old_groups = _group_rows(old_table, state['fingerprints'])
+    new_groups = _group_rows(table, fingerprints)
+    rows = []
+    for key, items in new_groups.items():
+        if key not in old_groups:
+            rows.append(['新增', *key, ''])
+        elif sorted(fp for _, fp in items) != sorted(fp for _, fp in old_groups[key]):
+            old_items = old_groups[key]
+            if len(old_items) != len(items):
+                # 同一学生有多条记录时只报告记录数的变化
+                detail = f"记录数 {len(old_items)}→{len(items)}"
+            else:
+                old_row = old_table.iloc[old_items[0][0]]
+                new_row = table.iloc[items[0][0]]
+                detail = '、'.join(_changed_columns(old_row, new_row)) or '原始数据'
+            rows.append(['修改', *key, detail])
+    for key in old_groups:
+        if key not in new_groups:
+            rows.append(['删除', *key, ''])
+    order = {'新增': 0, '删除': 1, '修改': 2}
+    rows.sort(key=lambda row: order[row[0]])
+    return pd.DataFrame(rows, columns=['变动'] + KEY_COLUMNS + ['变动项'], dtype=object)
+
+def changed_classes(old_table, table):
+    """写出内容（行、列和取值）与上次不同的班级；新出现的班级也算变动。参数均为 display_result 的导出表。"""
+    previous = {name: frame_rows(frame) for name, frame in class_frames(old_table, STANDARD_COLUMNS)}
+    return {name for name, frame in class_frames(table, STANDARD_COLUMNS)
+            if previous.get(name) != frame_rows(frame)}
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"⚠️ 无法删除文件 {path}：{e}")
+
+def incremental_process_scores(file_path, output_dir=None, export_workers=None, make_zip=False, metrics=None,
+                               columnar=None, standard=None):
+    """
+    增量版 process_scores：output_dir 中有上次的评分状态时只重新评分变动的行、只重写有变动的分班文件，
+    没有状态时等同于全量评分。返回的结果清单在 process_scores 的基础上增加：
+      change_report（变动报告 DataFrame，首次评分为 None）/ change_report_file / rescored_rows /
+      reused_files（原样保留的分班文件）
+    """
+    output_dir = output_dir or '.'
+    if metrics is None:
+        metrics = RunMetrics(source=file_path)
+    with metrics.run():
+        if columnar:
+            require_columnar(columnar)
+        rules = get_rules(standard)
+        print(f"📥 正在增量评分：{file_path}（评分标准：{rules.label}）")
+        state = load_state(output_dir)
+        final_result, fingerprints, rescored = score_workbook_incremental(file_path, state, metrics, rules)
+        if final_result is None:
+            metrics.status = 'no_data'
+            return None
+        metrics.count('rows_rescored', rescored)
+
+        def local(name):
+            return os.path.join(output_dir, name)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        table = display_result(final_result)
+        old_table = display_result(state['final_result']) if state is not None else None
+        with metrics.stage('cohort_stats'):
+            stats = cohort_stats(final_result)
+        old_files = set()
+        if state is not None:
+            old_files = {state['total_file'], *state['class_files'].values()}
+            old_files.update(name for name in (state['report_file'], state['zip_file'], state.get('columnar_file')) if name)
+
+        with metrics.stage('total_export'):
+            total_name = state['total_file'] if state is not None else None
+            if (total_name is None or not os.path.exists(local(total_name))
+                    or frame_rows(final_result) != frame_rows(state['final_result'])):
+                total_name = f"总表_评分结果_{timestamp}.xlsx"
+                write_styled_excel(table, local(total_name), extra_sheets=stats)
+                print(f"✅ 总表已保存：{local(total_name)}")
+
+        with metrics.stage('class_export'):
+            changed = changed_classes(old_table, table) if state is not None else None
+            class_files = {}
+            for class_name in table.groupby('班级').groups:
+                old_name = state['class_files'].get(class_name) if state is not None else None
+                if changed is not None and class_name not in changed and old_name and os.path.exists(local(old_name)):
+                    class_files[class_name] = old_name
+            reused = list(class_files.values())
+            to_write = table[~table['班级'].isin(list(class_files))]
+            records, _ = export_class_files(to_write, STANDARD_COLUMNS, timestamp, output_dir=output_dir,
+                                            workers=export_workers)
+            for record in records:
+                if record['错误'] is None:
+                    class_files[record['班级']] = os.path.basename(record['文件'])
+        metrics.add_files(records)
+        print(f"♻️ 复用 {len(reused)} 个未变动的分班文件，重写 {len(records)} 个")
+
+        report, report_name = None, None
+        if state is not None:
+            report = change_report(state, old_table, table, fingerprints)
+            counts = report['变动'].value_counts()
+            print(f"📝 变动：新增 {counts.get('新增', 0)} 人，删除 {counts.get('删除', 0)} 人，修改 {counts.get('修改', 0)} 人")
+            if not report.empty:
+                report_name = f"变动报告_{timestamp}.xlsx"
+                write_styled_excel(report, local(report_name))
+
+        zip_name = None
+        if make_zip:
+            # xlsx 本身已压缩，直接存储即可
+            zip_name = f"分班_评分结果_{timestamp}.zip"
+            with zipfile.ZipFile(local(zip_name), 'w', zipfile.ZIP_STORED) as zf:
+                for name in class_files.values():
+                    zf.write(local(name), arcname=name)
+            print(f"📦 分班文件已打包：{local(zip_name)}")
+
+        columnar_name = None
+        if columnar:
+            columnar_name = columnar_file_name(timestamp, columnar)
+            with metrics.stage('columnar_export'):
+                write_columnar(final_result, table, local(columnar_name), columnar)
+
+        # 删除被替换的旧文件和已不存在班级的文件
+        for name in old_files - {total_name, report_name, zip_name, columnar_name, *class_files.values()}:
+            if os.path.exists(local(name)):
+                _remove(local(name))
+
+        save_state(output_dir, {
+            'rules_version': rules.version,
+            'timestamp': timestamp,
+            'final_result': final_result,
+            'fingerprints': fingerprints,
+            'total_file': total_name,
+            'class_files': class_files,
+            'report_file': report_name,
+            'zip_file': zip_name,
+            'columnar_file': columnar_name,
+        })
+
+        print("🎉 增量评分完成")
+        metrics.status = 'ok'
+        return {
+            'output_dir': output_dir,
+            'timestamp': timestamp,
+            'total_file': local(total_name),
+            'class_files': [local(name) for name in class_files.values()],
+            'zip_file': local(zip_name) if zip_name else None,
+            'export_records': records,
+            'final_result': final_result,
+            'cohort_stats': stats,
+            'standard': rules.label,
+            'metrics': metrics,
+            'change_report': report,
+            'change_report_file': local(report_name) if report_name else None,
+            'columnar_file': local(columnar_name) if columnar_name else None,
+            'rescored_rows': rescored,
+            'reused_files': [local(name) for name in reused],
+        }
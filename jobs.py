@@ -0,0 +1,109 @@
+# jobs.py
+# 后台评分任务：评分在线程池中运行，页面只轮询任务的状态和进度，不再在一次脚本运行里卡住。
+# 任务登记表按上传内容（和所选评分标准）的哈希去重：同一份文件在评分过程中被重复提交（页面重跑、重新上传）时，
+# 直接返回正在运行的任务，不会重复评分。
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from result_cache import cache_key, cached_process_scores
+from workspace import JOB_TTL
+
+# 同时运行的后台评分任务数
+JOB_WORKERS = int(os.environ.get('SCORING_JOB_WORKERS', 2))
+# 保留的已结束任务数上限：每个任务的结果清单含总表 DataFrame 和已生成的文件字节，超出时淘汰最久未访问的任务
+JOB_KEEP = int(os.environ.get('SCORING_JOB_KEEP', 16))
+
+class ScoringJob:
+    """一个后台评分任务。status 依次为 queued / running，最后为 done 或 failed。"""
+
+    def __init__(self, key, file_path):
+        self.key = key
+        self.file_path = file_path
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = "排队等待评分"
+        self.manifest = None
+        self.error = None
+        self.submitted = time.time()
+        self.accessed = self.submitted
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def update(self, fraction, message):
+        """评分流程的进度回调（在工作线程中调用），进度只增不减。"""
+        self.progress = min(max(self.progress, fraction), 1.0)
+        self.message = message
+
+class JobRegistry:
+    """
+    后台评分任务登记表，按上传内容哈希登记；已结束的任务保留 ttl 秒供页面取结果，
+    但最多保留 keep 个（按最近访问时间淘汰），内存占用有上限。
+    """
+
+    def __init__(self, workers=None, ttl=None, keep=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or JOB_WORKERS, thread_name_prefix='scoring_job')
+        self.ttl = JOB_TTL if ttl is None else ttl
+        self.keep = JOB_KEEP if keep is None else keep
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_path, **kwargs):
+        """
+        提交 file_path 的评分任务（kwargs 传给 cached_process_scores），返回 ScoringJob。
+        相同内容的任务正在排队、运行或已成功完成时直接返回该任务；失败的任务会重新提交。
+        """
+        with open(file_path, 'rb') as f:
+            key = cache_key(f.read(), kwargs.get('standard'))
+        with self._lock:
+            self.prune()
+            job = self.jobs.get(key)
+            if job is not None and job.status != 'failed':
+                return job
+            job = ScoringJob(key, file_path)
+            self.jobs[key] = job
+            self.executor.submit(self._run, job, kwargs)
+        return job
+
+    def _run(self, job, kwargs):
+        job.status = 'running'
+        job.update(0.0, "开始评分")
+        try:
+            job.manifest = cached_process_scores(job.file_path, progress=job.update, **kwargs)
+        except Exception as e:
+            print(f"❌ 后台评分失败：{e}")
+            job.error = str(e)
+            status = 'failed'
+        else:
+            job.update(1.0, "评分完成")
+            status = 'done'
+        # 先记下结束时间再改状态：其他线程的 prune 看到任务已结束时 finished 一定有值
+        job.finished = time.time()
+        job.status = status
+
+    def get(self, key):
+        """取任务并记为最近访问；同时清理过期和超出数量上限的已结束任务。"""
+        with self._lock:
+            job = self.jobs.get(key)
+            if job is not None:
+                job.accessed = time.time()
+            self.prune()
+            return self.jobs.get(key)
+
+    def prune(self):
+        """
+        移除结束超过 ttl 的任务，已结束的任务超过 keep 个时再移除最久未访问的，返回移除的个数（调用方持有锁）。
+        移除时释放结果清单，其中的 DataFrame 和已生成的 Excel/zip 字节随之回收。
+        """
+        now = time.time()
+        finished = [job for job in self.jobs.values() if job.done and job.finished is not None]
+        expired = {job.key for job in finished if now - job.finished > self.ttl}
+        kept = sorted((job for job in finished if job.key not in expired), key=lambda job: job.accessed, reverse=True)
+        expired.update(job.key for job in kept[self.keep:])
+        for key in expired:
+            self.jobs.pop(key).manifest = None
+        return len(expired)
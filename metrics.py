@@ -0,0 +1,187 @@
+# metrics.py
+# 评分流程的运行指标：分阶段计时、行数和段落数、吞吐量、进程内存峰值、每个文件的写出耗时。
+# process_scores 把指标放在结果清单的 metrics 字段中；设置环境变量 SCORING_METRICS_LOG 后，
+# 每次运行还会向该文件追加一行 JSON。需要定位热点时可以为单次运行打开 cProfile。
+#
+# 用法（单次运行并打印分阶段耗时和 cProfile 热点）：
+#   python metrics.py 原始成绩.xlsx --profile run.prof
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+METRICS_LOG = os.environ.get('SCORING_METRICS_LOG')
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB），平台不支持时返回 None。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class RunMetrics:
+    """
+    一次评分运行的指标。同名阶段的耗时会累加（流式读取时读取和评分交替进行）。
+    profile 为 True 时用 cProfile 记录整次运行并保留热点摘要，为路径时另外保存 pstats 文件。
+    """
+
+    def __init__(self, source=None, log_path=None, profile=None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.log_path = METRICS_LOG if log_path is None else log_path
+        self.profile = profile
+        self.started = None
+        self.total_seconds = None
+        self.stages = {}
+        self.counts = {}
+        self.files = []
+        self.header_aliases = {}  # 原表头写法 -> 标准列名
+        self.unsupported_columns = []  # 评分标准不支持、未评分的项目列
+        self.status = None
+        self.error = None
+        self.peak_rss_mb = None
+        self.profile_text = None
+        self._depth = 0
+        self._start = None
+        self._profiler = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def timed(self, name, iterable):
+        """包装迭代器，把每次取下一项的耗时计入阶段 name。"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def add_aliases(self, aliases, unsupported=()):
+        """记录段落表头中应用的别名 [(原写法, 标准列名)] 和不支持的项目列。"""
+        self.header_aliases.update(aliases)
+        self.unsupported_columns.extend(name for name in unsupported if name not in self.unsupported_columns)
+
+    def add_files(self, records):
+        """记录写出的文件（导出记录含 班级/文件/耗时/错误）。"""
+        self.files.extend(records)
+
+    @contextmanager
+    def run(self):
+        """包住一次完整运行；可以嵌套，只有最外层负责总计时、cProfile 和写 JSON 行。"""
+        self._depth += 1
+        if self._depth == 1:
+            self.started = datetime.now().isoformat(timespec='seconds')
+            self._start = time.perf_counter()
+            if self.profile:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        try:
+            yield self
+        except Exception as e:
+            self.status = 'error'
+            self.error = str(e)
+            raise
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish()
+
+    def _finish(self):
+        self.total_seconds = time.perf_counter() - self._start
+        self.peak_rss_mb = peak_rss_mb()
+        if self._profiler is not None:
+            self._profiler.disable()
+            if isinstance(self.profile, str):
+                self._profiler.dump_stats(self.profile)
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(25)
+            self.profile_text = out.getvalue()
+            self._profiler = None
+        if self.log_path:
+            self.emit(self.log_path)
+
+    @property
+    def rows_per_sec(self):
+        rows = self.counts.get('rows_scored', 0)
+        if not self.total_seconds:
+            return None
+        return round(rows / self.total_seconds)
+
+    def breakdown(self):
+        """分阶段耗时表：[{阶段, 耗时(秒), 占比}]，按耗时从大到小排列。"""
+        total = self.total_seconds or sum(self.stages.values()) or 1.0
+        return [{'阶段': name, '耗时(秒)': round(seconds, 3), '占比': f"{seconds / total:.0%}"}
+                for name, seconds in sorted(self.stages.items(), key=lambda item: -item[1])]
+
+    def to_dict(self):
+        return {
+            'run_id': self.run_id,
+            'started': self.started,
+            'source': self.source,
+            'status': self.status,
+            'error': self.error,
+            'total_seconds': round(self.total_seconds, 4) if self.total_seconds is not None else None,
+            'rows_per_sec': self.rows_per_sec,
+            'peak_rss_mb': self.peak_rss_mb,
+            'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'counts': dict(self.counts),
+            'header_aliases': dict(self.header_aliases),
+            'unsupported_columns': list(self.unsupported_columns),
+            'files': [dict(r, 耗时=round(r['耗时'], 4)) for r in self.files],
+        }
+
+    def emit(self, path):
+        """向 path 追加一行 JSON；写入失败只打印警告。"""
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.to_dict(), ensure_ascii=False, default=str) + '\n')
+        except OSError as e:
+            print(f"⚠️ 写入运行指标失败：{e}")
+
+def main(argv=None):
+    from scoring_script import process_scores
+
+    parser = argparse.ArgumentParser(description='单次评分并打印分阶段耗时')
+    parser.add_argument('file', help='原始成绩表 .xlsx')
+    parser.add_argument('--output-dir', help='结果输出目录（默认临时目录）')
+    parser.add_argument('--profile', nargs='?', const=True, help='打开 cProfile，可指定 pstats 文件路径')
+    parser.add_argument('--log', help='追加 JSON 行的指标文件（默认取 SCORING_METRICS_LOG）')
+    args = parser.parse_args(argv)
+
+    metrics = RunMetrics(source=args.file, log_path=args.log, profile=args.profile)
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix='scoring_metrics_')
+    process_scores(args.file, output_dir=output_dir, metrics=metrics)
+
+    print(f"⏱️ 共 {metrics.total_seconds:.2f}s，{metrics.rows_per_sec} 行/秒，峰值内存 {metrics.peak_rss_mb} MB")
+    for row in metrics.breakdown():
+        print(f"   {row['阶段']:<18}{row['耗时(秒)']:>9.3f}s  {row['占比']:>4}")
+    if metrics.profile_text:
+        print(metrics.profile_text)
+
+if __name__ == '__main__':
+    main()
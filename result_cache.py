@@ -0,0 +1,230 @@
+# result_cache.py
+# 评分结果缓存：以“上传文件内容 + 所选评分标准的版本 + 表头别名表的版本”的哈希为键，把总表 DataFrame、统计结果和生成的 Excel/zip
+# 保存在本地磁盘。同一份文件重复上传、刷新页面或新会话都直接复用结果，不再重新评分。
+# 缓存按条目大小和最后访问时间做 LRU 淘汰。
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from columnar import columnar_file_name, require_columnar, write_columnar
+from header_aliases import ALIASES_VERSION
+from metrics import RunMetrics
+from rule_registry import get_rules
+from scoring_script import display_result, in_memory_manifest, process_scores
+
+CACHE_ROOT = os.environ.get('SCORING_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'student_scoring_cache')
+CACHE_MAX_BYTES = int(os.environ.get('SCORING_CACHE_MAX_MB', 1024)) * 1024 * 1024
+CACHE_MAX_AGE = int(os.environ.get('SCORING_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+# 缓存内容格式的版本，评分输出格式变化时递增，使旧缓存失效
+CACHE_FORMAT = 'v5'
+
+MANIFEST_NAME = 'manifest.json'
+RESULT_NAME = 'final_result.pkl'
+STATS_NAME = 'cohort_stats.pkl'
+
+def cache_key(data, standard=None):
+    """上传文件字节 + 评分标准 standard（默认为内置标准）的规则版本 + 表头别名表版本 + 缓存格式 的 sha256。"""
+    h = hashlib.sha256()
+    h.update(data)
+    h.update(f"|{get_rules(standard).version}|{ALIASES_VERSION}|{CACHE_FORMAT}".encode('utf-8'))
+    return h.hexdigest()
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+class ResultCache:
+    """磁盘上的评分结果缓存，每个键一个子目录。"""
+
+    def __init__(self, root=None, max_bytes=None, max_age=None):
+        self.root = root or CACHE_ROOT
+        self.max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age = CACHE_MAX_AGE if max_age is None else max_age
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def contains(self, key):
+        return os.path.exists(os.path.join(self._entry(key), MANIFEST_NAME))
+
+    def put(self, key, manifest):
+        """
+        把一次评分的结果清单存入缓存：总是保存 final_result 和 cohort_stats，
+        文件模式的清单还会保存总表/分班/zip 文件（内存模式的清单没有文件）。
+        """
+        entry = self._entry(key)
+        tmp = tempfile.mkdtemp(prefix=f"{key[:8]}_", dir=self.root)
+        try:
+            manifest['final_result'].to_pickle(os.path.join(tmp, RESULT_NAME))
+            pd.to_pickle(manifest['cohort_stats'], os.path.join(tmp, STATS_NAME))
+            meta = {'timestamp': manifest['timestamp'], 'total_file': None}
+            if manifest.get('total_file'):
+                files = [manifest['total_file']] + manifest['class_files']
+                if manifest['zip_file']:
+                    files.append(manifest['zip_file'])
+                for path in files:
+                    shutil.copy2(path, os.path.join(tmp, os.path.basename(path)))
+                meta.update({
+                    'total_file': os.path.basename(manifest['total_file']),
+                    'class_files': [os.path.basename(p) for p in manifest['class_files']],
+                    'zip_file': os.path.basename(manifest['zip_file']) if manifest['zip_file'] else None,
+                    'export_records': [dict(r, 文件=os.path.basename(r['文件'])) for r in manifest['export_records']],
+                })
+            with open(os.path.join(tmp, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, default=str)
+
+            # 先写临时目录再改名，避免并发读到写了一半的条目
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+
+    def _load(self, key):
+        """读取条目的 (meta, final_result, cohort_stats) 并记录访问时间；不存在或损坏时返回 None。"""
+        entry = self._entry(key)
+        meta_path = os.path.join(entry, MANIFEST_NAME)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            final_result = pd.read_pickle(os.path.join(entry, RESULT_NAME))
+            stats = pd.read_pickle(os.path.join(entry, STATS_NAME))
+            os.utime(meta_path)  # 记录最近访问时间，用于 LRU
+        except Exception as e:
+            if os.path.exists(entry):
+                print(f"⚠️ 缓存条目损坏，已忽略：{e}")
+                shutil.rmtree(entry, ignore_errors=True)
+            return None
+        return meta, final_result, stats
+
+    def restore_frame(self, key):
+        """只取缓存的总表 DataFrame 和统计结果，返回 (final_result, timestamp, cohort_stats)；未命中返回 None。"""
+        loaded = self._load(key)
+        if loaded is None:
+            return None
+        meta, final_result, stats = loaded
+        return final_result, meta['timestamp'], stats
+
+    def restore(self, key, output_dir):
+        """
+        命中时把缓存的文件复制到 output_dir，返回与 process_scores 相同结构的结果清单；
+        未命中或条目中没有文件（内存模式写入）时返回 None。
+        """
+        entry = self._entry(key)
+        loaded = self._load(key)
+        if loaded is None or loaded[0]['total_file'] is None:
+            return None
+        meta, final_result, stats = loaded
+        try:
+            names = [meta['total_file']] + meta['class_files'] + ([meta['zip_file']] if meta['zip_file'] else [])
+            for name in names:
+                shutil.copy2(os.path.join(entry, name), os.path.join(output_dir, name))
+        except OSError as e:
+            print(f"⚠️ 缓存条目损坏，已忽略：{e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        def local(name):
+            return os.path.join(output_dir, name)
+
+        return {
+            'output_dir': output_dir,
+            'timestamp': meta['timestamp'],
+            'total_file': local(meta['total_file']),
+            'class_files': [local(n) for n in meta['class_files']],
+            'zip_file': local(meta['zip_file']) if meta['zip_file'] else None,
+            'export_records': [dict(r, 文件=local(r['文件'])) for r in meta['export_records']],
+            'final_result': final_result,
+            'cohort_stats': stats,
+        }
+
+    def evict(self):
+        """删除超龄条目，总大小仍超限时按最近访问时间从旧到新删除。返回删除的条目数。"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            meta_path = os.path.join(path, MANIFEST_NAME)
+            if not os.path.exists(meta_path):
+                continue
+            entries.append((os.path.getmtime(meta_path), _dir_size(path), path))
+
+        removed = 0
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for atime, size, path in entries:
+            if now - atime > self.max_age or total > self.max_bytes:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                removed += 1
+        return removed
+
+def _restore_columnar(manifest, output_dir, fmt, metrics):
+    """命中缓存时按需用缓存的总表 DataFrame 写出列式总表（缓存中不保存列式文件），返回文件路径；不需要时返回 None。"""
+    if not fmt:
+        return None
+    require_columnar(fmt)
+    path = os.path.join(output_dir, columnar_file_name(manifest['timestamp'], fmt))
+    with metrics.stage('columnar_export'):
+        write_columnar(manifest['final_result'], display_result(manifest['final_result']), path, fmt)
+    print(f"✅ 列式总表已保存：{path}")
+    return path
+
+def cached_process_scores(file_path, output_dir=None, cache=None, **kwargs):
+    """
+    带缓存的 process_scores：命中时直接复制缓存结果到 output_dir，否则评分后写入缓存。
+    in_memory=True 时命中只需要缓存的 DataFrame，结果清单同 process_scores 的内存模式；
+    文件模式下要求 columnar 时，命中后由缓存的 DataFrame 另外写出列式总表。
+    返回结果清单（额外带 cache_hit 字段），无有效数据时返回 None（不缓存）。
+    命中时结果清单的 metrics 只包含 cache_lookup 阶段。
+    """
+    cache = cache or ResultCache()
+    progress = kwargs.get('progress')
+    metrics = kwargs.pop('metrics', None) or RunMetrics(source=file_path)
+    with metrics.run():
+        with metrics.stage('cache_lookup'):
+            with open(file_path, 'rb') as f:
+                key = cache_key(f.read(), kwargs.get('standard'))
+
+            if kwargs.get('in_memory'):
+                hit = cache.restore_frame(key)
+                manifest = in_memory_manifest(*hit) if hit is not None else None
+            else:
+                manifest = cache.restore(key, output_dir or '.')
+            if manifest is not None:
+                manifest['standard'] = get_rules(kwargs.get('standard')).label
+            if manifest is not None and kwargs.get('make_zip') and not manifest['zip_file']:
+                manifest = None  # 缓存中没有要求的 zip，按未命中处理
+        if manifest is not None:
+            print(f"⚡ 命中评分缓存：{key[:12]}")
+            if not kwargs.get('in_memory'):
+                manifest['columnar_file'] = _restore_columnar(manifest, output_dir or '.', kwargs.get('columnar'), metrics)
+            metrics.status = 'cache_hit'
+            if progress is not None:
+                progress(1.0, "命中评分缓存")
+            manifest['cache_hit'] = True
+            manifest['metrics'] = metrics
+            return manifest
+
+        manifest = process_scores(file_path, output_dir=output_dir, metrics=metrics, **kwargs)
+        if manifest is not None:
+            with metrics.stage('cache_store'):
+                try:
+                    cache.put(key, manifest)
+                except OSError as e:
+                    print(f"⚠️ 写入评分缓存失败：{e}")
+            manifest['cache_hit'] = False
+        return manifest
@@ -0,0 +1,123 @@
+# rule_compiler.py
+# 评分规则编译器：把 scoring_rules.py 中的 (low, up, pts) 列表在第一次使用时编译成有序分段表，
+# 查分从逐条扫描变为 O(log n) 的 searchsorted，并顺带检查各项目规则的重叠与缺口（按端点分辨率，只报告真正的问题）。
+
+import hashlib
+from functools import lru_cache
+import numpy as np
+from scoring_rules import MALE_RULES, FEMALE_RULES
+
+class RuleTable:
+    """
+    单个项目的编译结果。
+    所有端点排序去重为 points，数轴被切成“端点本身”和“相邻端点之间的开区间”两类小段，
+    region_pts[2*i+1] 为端点 points[i] 的得分，region_pts[2*i] 为 points[i-1] 与 points[i] 之间开区间的得分。
+    每一小段取原列表中第一条覆盖它的规则，因此与逐条扫描 low <= val <= up 的结果完全一致；
+    无规则覆盖（缺口或超范围）为 NaN。
+    """
+
+    def __init__(self, project, rules):
+        self.project = project
+        self.rules = list(rules)
+        self.points = np.unique(np.array([b for low, up, _ in self.rules for b in (low, up)], dtype=float))
+        self.region_pts = np.full(2 * len(self.points) + 1, np.nan)
+        for i, p in enumerate(self.points):
+            self.region_pts[2 * i + 1] = self._first_match(lambda low, up: low <= p <= up)
+            if i + 1 < len(self.points):
+                nxt = self.points[i + 1]
+                self.region_pts[2 * i + 2] = self._first_match(lambda low, up: low <= p and nxt <= up)
+        self.issues = check_rules(project, self.rules)
+
+    def _first_match(self, covers):
+        for low, up, pts in self.rules:
+            if covers(low, up):
+                return pts
+        return np.nan
+
+    def lookup(self, values):
+        """values 为 float 数组，返回得分数组（NaN 表示无对应得分）。"""
+        values = np.asarray(values, dtype=float)
+        pos = np.searchsorted(self.points, values, side='left')
+        last = len(self.points) - 1
+        exact = (pos <= last) & (self.points[np.minimum(pos, last)] == values)
+        return self.region_pts[2 * pos + exact]
+
+def bound_step(rules):
+    """规则端点的分辨率：端点中最多的小数位数对应的步长（例如 25.9、26.0 为 0.1，2.819 为 0.001）。"""
+    decimals = 0
+    for low, up, _ in rules:
+        for b in (low, up):
+            while decimals < 6 and abs(round(b, decimals) - b) > 1e-9:
+                decimals += 1
+    return decimals, 10 ** -decimals
+
+def _boundary_side(rules, point):
+    """共用端点 point 按先出现的规则计分时归入哪一档：'upper'（下界为该点的规则）或 'lower'。"""
+    for low, up, _ in rules:
+        if low <= point <= up:
+            return 'upper' if low == point else 'lower'
+    return None
+
+def check_rules(project, rules):
+    """
+    检查一个项目的规则区间，只报告真正的问题，返回问题描述列表：
+      缺口：相邻区间之间留空且宽于端点分辨率（bound_step；x.9 与 x+1.0 之间只差一个步长，不算缺口），落在缺口中的成绩按超范围处理；
+      重叠：两个得分不同的区间相交超过一个端点；
+      端点归属不一致：相邻区间共用端点（如 217–220 与 220–1000）时按先出现的规则计分，
+        同一项目中大多数共用端点归入同一档，与之相反的端点单独报告。
+    """
+    issues = []
+    decimals, step = bound_step(rules)
+    ordered = sorted(rules, key=lambda r: (r[0], r[1]))
+    shared = []
+    reach = ordered[0] if ordered else None
+    for rule in ordered[1:]:
+        low, up, pts = rule
+        prev_low, prev_up, prev_pts = reach
+        if round(low - prev_up, decimals + 1) > step:
+            issues.append(f"{project}：{prev_up} 与 {low} 之间存在缺口")
+        elif low < prev_up and pts != prev_pts:
+            issues.append(f"{project}：区间 [{prev_low}, {prev_up}]({prev_pts}分) 与 [{low}, {up}]({pts}分) 重叠")
+        elif low == prev_up and pts != prev_pts:
+            shared.append(low)
+        if up >= prev_up:
+            reach = rule
+    sides = [(point, _boundary_side(rules, point)) for point in shared]
+    majority = max(('upper', 'lower'), key=lambda side: sum(s == side for _, s in sides))
+    for point, side in sides:
+        if side != majority:
+            issues.append(f"{project}：共用端点 {point} 归入{'较高' if side == 'upper' else '较低'}一档，"
+                          f"与本项目其他 {len(sides) - 1} 个共用端点的归属相反")
+    return issues
+
+def compile_rules(rule_dict):
+    return {proj: RuleTable(proj, rules) for proj, rules in rule_dict.items()}
+
+# 规则内容的指纹，规则表有任何改动都会变化（用于结果缓存的键）
+RULES_VERSION = hashlib.sha256(repr((MALE_RULES, FEMALE_RULES)).encode('utf-8')).hexdigest()[:16]
+
+@lru_cache(maxsize=None)
+def compiled_rules():
+    """内置规则表第一次使用时编译一次，之后所有评分路径共用（导入本模块时不编译，服务启动更快）。"""
+    return {
+        '男': compile_rules(MALE_RULES),
+        '女': compile_rules(FEMALE_RULES),
+    }
+
+def lookup(gender, project, values):
+    """
+    按性别和项目查分。values 可为标量或数组：
+    标量返回得分（无对应得分时返回 None），数组返回 float 数组（NaN 表示无对应得分）。
+    """
+    table = compiled_rules()[gender][project]
+    if np.ndim(values) == 0:
+        pts = table.lookup([values])[0]
+        return None if np.isnan(pts) else float(pts)
+    return table.lookup(values)
+
+if __name__ == '__main__':
+    for gender, tables in compiled_rules().items():
+        for proj, table in tables.items():
+            print(f"📏 {gender} {proj}：{len(table.rules)} 条规则，{len(table.issues)} 处重叠/缺口")
+            for issue in table.issues:
+                print(f"   ⚠️ {issue}")
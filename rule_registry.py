@@ -0,0 +1,229 @@
+# rule_registry.py
+# 多套评分标准：除 scoring_rules.py 中内置的默认标准外，还可以把不同年级、不同年份的评分表
+# 写成 JSON / YAML / xlsx 文件放在规则目录（环境变量 SCORING_RULES_DIR）中，按（标准, 年级, 性别）登记。
+# 每套标准只编译一次，所有评分任务共用；文件修改时间变化时自动重新加载，不需要重启服务。
+#
+# JSON / YAML 文件为一个或多个标准（列表）：
+#   {"standard": "国家标准2014", "grade": "初三",
+#    "rules": {"男": {"引体向上": [[26, 100, 100], [25, 25.9, 98], ...], ...}, "女": {...}}}
+# xlsx 文件第一个工作表为规则明细，表头为：标准、年级、性别、项目、下限、上限、得分（年级可空）。
+
+import hashlib
+import json
+import os
+import threading
+from rule_compiler import RULES_VERSION, compile_rules, compiled_rules
+from scoring_rules import MALE_RULES, FEMALE_RULES
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+RULES_DIR = os.environ.get('SCORING_RULES_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '评分标准')
+RULE_EXTENSIONS = ('.json', '.yaml', '.yml', '.xlsx')
+
+DEFAULT_STANDARD = '默认标准'
+GENDERS = ('男', '女')
+# 各性别可以评分的项目（即总表中的得分列），外部标准只能使用其中的项目
+PROJECTS = {'男': list(MALE_RULES), '女': list(FEMALE_RULES)}
+
+XLSX_COLUMNS = ['标准', '年级', '性别', '项目', '下限', '上限', '得分']
+
+class RuleSet:
+    """
+    一套评分标准（某标准某年级的男女生规则）。rules 为 {性别: {项目: [(low, up, pts), ...]}}，
+    compiled 为同结构的 RuleTable 或返回它的函数，省略时由 rules 编译；规则表在第一次使用时才编译。
+    version 为规则内容的指纹（用于结果缓存和增量评分的键）。
+    """
+
+    def __init__(self, standard, grade, rules, source=None, compiled=None, version=None):
+        self.standard = standard
+        self.grade = grade
+        self.rules = rules
+        self.source = source
+        self._compiled = compiled
+        self.version = version or hashlib.sha256(repr((standard, grade, rules)).encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = {gender: compile_rules(rule_dict) for gender, rule_dict in self.rules.items()}
+        elif callable(self._compiled):
+            self._compiled = self._compiled()
+        return self._compiled
+
+    @property
+    def label(self):
+        """标准的显示名，也是选择标准时使用的名称：“标准/年级”，没有年级时为标准名。"""
+        return f"{self.standard}/{self.grade}" if self.grade else self.standard
+
+    def tables(self, gender):
+        """该性别按 PROJECTS 顺序排列的 (项目, RuleTable)，标准中没有的项目不列出。"""
+        compiled = self.compiled.get(gender, {})
+        return [(proj, compiled[proj]) for proj in PROJECTS[gender] if proj in compiled]
+
+    @property
+    def issues(self):
+        return [issue for tables in self.compiled.values() for table in tables.values() for issue in table.issues]
+
+# 内置标准与 rule_compiler 共用同一份编译结果（第一次评分时编译），版本与 RULES_VERSION 一致
+DEFAULT_RULES = RuleSet(DEFAULT_STANDARD, None, {'男': MALE_RULES, '女': FEMALE_RULES},
+                        compiled=compiled_rules, version=RULES_VERSION)
+
+def _rule_tuple(rule, where):
+    try:
+        low, up, pts = (float(v) for v in rule)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}：规则应为 [下限, 上限, 得分] 三个数值，实际为 {rule!r}") from None
+    if low > up:
+        raise ValueError(f"{where}：下限 {low} 大于上限 {up}")
+    return low, up, pts
+
+def _make_rule_set(entry, source):
+    """把一个标准的 dict（standard / grade / rules）校验后生成 RuleSet。"""
+    name = os.path.basename(source)
+    standard = str(entry.get('standard') or '').strip()
+    if not standard:
+        raise ValueError(f"{name}：缺少标准名称（standard）")
+    grade = str(entry['grade']).strip() if entry.get('grade') not in (None, '') else None
+    rules = {}
+    for gender, rule_dict in (entry.get('rules') or {}).items():
+        if gender not in GENDERS:
+            raise ValueError(f"{name}：性别只能是“男”或“女”，实际为 {gender!r}")
+        unknown = [proj for proj in rule_dict if proj not in PROJECTS[gender]]
+        if unknown:
+            raise ValueError(f"{name}：{gender}生不支持的项目 {'、'.join(map(str, unknown))}"
+                             f"（可用：{'、'.join(PROJECTS[gender])}）")
+        rules[gender] = {proj: [_rule_tuple(rule, f"{name} {standard} {gender} {proj}") for rule in project_rules]
+                         for proj, project_rules in rule_dict.items()}
+    if not rules:
+        raise ValueError(f"{name}：标准 {standard} 没有任何规则")
+    return RuleSet(standard, grade, rules, source=source)
+
+def _xlsx_entries(path):
+    """xlsx 规则明细按（标准, 年级）汇总为与 JSON 相同结构的标准列表。"""
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(v).strip() if v is not None else '' for v in next(rows, [])]
+        missing = [col for col in XLSX_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)}：缺少列 {'、'.join(missing)}")
+        index = [header.index(col) for col in XLSX_COLUMNS]
+        entries = {}
+        for row in rows:
+            standard, grade, gender, proj, low, up, pts = (row[i] if i < len(row) else None for i in index)
+            if standard is None and proj is None:
+                continue
+            entry = entries.setdefault((standard, grade), {'standard': standard, 'grade': grade, 'rules': {}})
+            entry['rules'].setdefault(str(gender).strip(), {}).setdefault(str(proj).strip(), []).append((low, up, pts))
+        return list(entries.values())
+    finally:
+        wb.close()
+
+def load_rule_file(path):
+    """读取一个规则文件，返回其中各标准的 RuleSet 列表；格式错误时抛出 ValueError。"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        entries = _xlsx_entries(path)
+    elif ext == '.json':
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        if yaml is None:
+            raise ImportError(f"读取 YAML 规则文件需要安装 PyYAML：pip install pyyaml（{os.path.basename(path)}）")
+        with open(path, encoding='utf-8') as f:
+            entries = yaml.safe_load(f)
+    if isinstance(entries, dict):
+        entries = [entries]
+    return [_make_rule_set(entry, path) for entry in entries or []]
+
+class RuleRegistry:
+    """
+    评分标准登记表：内置默认标准加上规则目录中的所有标准，按显示名（标准/年级）查找。
+    每次查找时检查规则文件的修改时间，只重新加载有变化的文件；加载失败时保留该文件上一次的标准。
+    """
+
+    def __init__(self, root=None):
+        self.root = RULES_DIR if root is None else root
+        self._files = {}  # 文件路径 -> (修改时间, [RuleSet])
+        self._standards = {DEFAULT_STANDARD: DEFAULT_RULES}
+        self._lock = threading.Lock()
+
+    def _rule_files(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.path.join(self.root, name) for name in os.listdir(self.root)
+                      if name.lower().endswith(RULE_EXTENSIONS) and not name.startswith(('~$', '.')))
+
+    def refresh(self):
+        """按修改时间重新加载变动的规则文件，移除已删除的文件，返回重新加载的文件数。"""
+        reloaded = 0
+        with self._lock:
+            paths = self._rule_files()
+            removed = set(self._files) - set(paths)
+            for path in removed:
+                del self._files[path]
+            for path in paths:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                if path in self._files and self._files[path][0] == mtime:
+                    continue
+                try:
+                    rule_sets = load_rule_file(path)
+                except Exception as e:
+                    print(f"⚠️ 评分标准文件加载失败，沿用上一次的内容：{e}")
+                    previous = self._files.get(path, (None, []))[1]
+                    self._files[path] = (mtime, previous)
+                    continue
+                self._files[path] = (mtime, rule_sets)
+                reloaded += 1
+                print(f"📏 已加载评分标准：{os.path.basename(path)}（{'、'.join(r.label for r in rule_sets)}）")
+            if reloaded or removed:
+                self._standards = self._collect()
+        return reloaded
+
+    def _collect(self):
+        # 多个文件中同名的标准取文件名排序靠前的一个
+        result = {DEFAULT_STANDARD: DEFAULT_RULES}
+        for path in sorted(self._files):
+            for rule_set in self._files[path][1]:
+                if rule_set.label in result:
+                    print(f"⚠️ 评分标准 {rule_set.label} 重复，忽略 {os.path.basename(path)} 中的定义")
+                    continue
+                result[rule_set.label] = rule_set
+        return result
+
+    def standards(self):
+        """{显示名: RuleSet}，默认标准在最前。"""
+        self.refresh()
+        return dict(self._standards)
+
+    def get(self, standard=None):
+        """按显示名取 RuleSet，None 为默认标准；不存在时抛出 ValueError。"""
+        if standard is None or standard == DEFAULT_STANDARD:
+            return DEFAULT_RULES
+        standards = self.standards()
+        if standard not in standards:
+            raise ValueError(f"未找到评分标准：{standard}（可用：{'、'.join(standards)}）")
+        return standards[standard]
+
+# 进程内共用的登记表（服务进程中也只有这一个）：同一标准的编译结果在所有评分任务之间共享
+REGISTRY = RuleRegistry()
+
+def get_rules(standard=None):
+    return REGISTRY.get(standard)
+
+def available_standards():
+    return list(REGISTRY.standards())
+
+if __name__ == '__main__':
+    for label, rule_set in REGISTRY.standards().items():
+        source = os.path.basename(rule_set.source) if rule_set.source else '内置'
+        print(f"📏 {label}（{source}，版本 {rule_set.version}）：{len(rule_set.issues)} 处重叠/缺口")
+        for issue in rule_set.issues:
+            print(f"   ⚠️ {issue}")
@@ -1,43 +1,27 @@
 import os
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment, Font, Border, Side
-from scoring_rules import MALE_RULES, FEMALE_RULES
-
-def clean_old_files():
-    for file in os.listdir():
-        if file.endswith(".xlsx") and "评分结果" in file:
+from rule_registry import PROJECTS, get_rules
+from excel_reader import read_sheets, sheet_rows, sheet_segments
+from header_aliases import format_aliases
+from excel_writer import LazyWorkbook, write_styled_excel
+from class_export import LazyZip, export_class_files, lazy_class_workbooks
+from cohort_stats import cohort_stats
+from metrics import RunMetrics
+from columnar import (COLUMNAR_FORMATS, columnar_file_name, is_table_input, read_table_rows, require_columnar,
+                      write_columnar)
+
+def clean_old_files(directory=None):
+    directory = directory or '.'
+    for file in os.listdir(directory):
+        if file.endswith((".xlsx", ".zip") + tuple(COLUMNAR_FORMATS.values())) and "评分结果" in file:
             try:
-                os.remove(file)
+                os.remove(os.path.join(directory, file))
             except Exception as e:
                 print(f"⚠️ 无法删除文件 {file}：{e}")
 
-def beautify_excel(file_path):
-    wb = load_workbook(file_path)
-    ws = wb.active
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                         top=Side(style='thin'), bottom=Side(style='thin'))
-
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = thin_border
-            if cell.row == 1:
-                cell.font = Font(bold=True)
-
-    for col in ws.columns:
-        max_length = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            try:
-                max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        ws.column_dimensions[col_letter].width = max_length + 2
-
-    wb.save(file_path)
-
 def parse_time(val):
     """
     将 800米/1500米 的原始输入转换为总秒数：
@@ -76,181 +60,478 @@ def parse_time(val):
     except Exception:
         return None
 
-def process_scores(file_path):
-    print(f"📥 正在读取文件：{file_path}")
-    clean_old_files()
+# 数值单元格：str() 后再 float() 与直接取值完全相同，可以整列换算（np.float32 等不满足，逐个处理）
+_EXACT_NUMBER_TYPES = (float, int, np.float64, np.int64)
 
-    raw_df = pd.read_excel(file_path, header=None)
-    header_indices = raw_df[raw_df.apply(lambda row: row.astype(str).str.contains('性别').any(), axis=1)].index.tolist()
-    print(f"🔍 识别到 {len(header_indices)} 个表头段落")
+def _round2(num):
+    """与逐个 round(x, 2) 一致的整列两位小数舍入：np.round 只在远离 .005 边界时可靠，边界附近回退到 Python round。"""
+    rounded = np.round(num, 2)
+    scaled = num * 100
+    near_half = (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6) | (np.abs(num) >= 1e13)
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(num[i]), 2)
+    return rounded
 
-    all_results = []
-    time_projects = ['1500米', '800米']
-
-    for i, header_idx in enumerate(header_indices):
-        end_idx = header_indices[i + 1] if i + 1 < len(header_indices) else len(raw_df)
-        segment = raw_df.iloc[header_idx:end_idx].reset_index(drop=True)
-        segment.columns = segment.iloc[0]
-        df = segment[1:].reset_index(drop=True)
+def parse_time_series(series):
+    """
+    parse_time 的整列版本，逐格结果与 parse_time 完全一致：只有数值单元格（Excel 中最常见的 m.ss 写法）
+    用 numpy 整列换算；文本（"m:ss"、全角 "m：ss" 等）仍逐个交给 parse_time——对 object 列做正则提取
+    并不比逐格解析快。
+    返回 (总秒数 Series（无法解析为 NaN）, 时间格式错误掩码 Series（空单元格不算错误）)。
+    """
+    series = pd.Series(series, dtype=object)
+    raw = series.to_numpy()
+    missing = pd.isna(raw)
+    seconds = np.full(len(raw), np.nan)
+
+    is_number = np.fromiter((type(v) in _EXACT_NUMBER_TYPES for v in raw), dtype=bool, count=len(raw)) & ~missing
+    pos = np.flatnonzero(is_number)
+    num = raw[pos].astype(float)
+    # 无穷大和超大数值的溢出行为交给 parse_time
+    fast = np.isfinite(num) & (np.abs(num) < 1e13)
+    pos = pos[fast]
+    num = _round2(num[fast])
+    mins = np.trunc(num)
+    secs = np.rint((num - mins) * 100)
+    valid = (secs >= 0) & (secs < 60) & (mins >= 0)
+    seconds[pos[valid]] = mins[valid] * 60 + secs[valid]
+
+    slow = ~missing
+    slow[pos] = False
+    for i in np.flatnonzero(slow):
+        parsed = parse_time(raw[i])
+        if parsed is not None:
+            seconds[i] = parsed if abs(parsed) < 1e300 else np.inf
+
+    errors = ~missing & np.isnan(seconds)
+    return pd.Series(seconds, index=series.index), pd.Series(errors, index=series.index)
+
+TIME_PROJECTS = ['1500米', '800米']
+
+# 项目 -> 合并展示用的得分列
+SCORE_COLUMNS = {
+    '引体向上': '仰卧起坐/引体向上_得分', '仰卧起坐': '仰卧起坐/引体向上_得分',
+    '1500米': '800米/1500米_得分', '800米': '800米/1500米_得分',
+}
+
+# 内部结果中的单项得分为 float32（无得分为 NaN），另有一个 int8 状态列记录无得分的原因；
+# 教师看到的“无”和“缺：…”备注只在导出时由 display_result 生成
+SCORE_FIELDS = ['仰卧起坐/引体向上_得分', '800米/1500米_得分', '1分钟跳绳_得分', '立定跳远_得分', '抛实心球_得分', '100米_得分']
+STATUS_COLUMNS = {col: f"{col}_状态" for col in SCORE_FIELDS}
+# STATUS_NOT_RATED：所选评分标准中该性别没有这个项目，不计入备注
+STATUS_OK, STATUS_MISSING, STATUS_FORMAT_ERROR, STATUS_NON_NUMERIC, STATUS_OUT_OF_RANGE, STATUS_NOT_RATED = range(6)
+# 各状态在备注中的写法，按状态码排列
+STATUS_NOTES = ["", "{}", "{}(时间格式错误)", "{}(非数值)", "{}(超范围)", ""]
+
+def _to_float(val):
+    try:
+        return float(val)
+    except Exception:
+        return None
 
-        required_cols = ['姓名', '性别', '班级']
-        if any(col not in df.columns for col in required_cols):
-            print(f"⚠️ 段落缺少字段，跳过")
+def _coerce_numeric(values):
+    """
+    整列转数值，与逐个 float(val) 的结果一致：先用 pd.to_numeric 批量转换，
+    只有批量转换失败的脏数据（全角数字等）才逐个回退到 float()。
+    返回 (float 数组, 非数值掩码)。
+    """
+    try:
+        nums = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+    except Exception:
+        nums = np.full(len(values), np.nan)
+    bad = np.zeros(len(values), dtype=bool)
+    for i in np.flatnonzero(np.isnan(nums)):
+        v = _to_float(values[i])
+        if v is None:
+            bad[i] = True
+        else:
+            nums[i] = v
+    return nums, bad
+
+def _coerce_time(values):
+    seconds, bad = parse_time_series(values)
+    return seconds.to_numpy(dtype=float), bad.to_numpy(dtype=bool)
+
+def _join_remarks(acc, item):
+    """按项目顺序把缺项说明拼接到每行的备注上（空串表示本项无缺）。"""
+    joined = np.where(acc == "", item, acc + "、" + item)
+    return np.where(item == "", acc, joined)
+
+def score_segment(df, result, rules):
+    """
+    按列评分一个段落：df 为原始数据（已过滤为男/女），按评分标准 rules（RuleSet）查分，
+    得分、状态、总分和平均分直接写入 result。导出后与逐行评分完全一致（包括“无”单元格和“缺：…”备注）。
+    """
+    n = len(df)
+    gender = df['性别'].to_numpy(dtype=object)
+
+    def column(col):
+        if col in df.columns:
+            return df[col].to_numpy(dtype=object).copy()
+        return np.full(n, None, dtype=object)
+
+    values = {proj: column(proj) for proj in ['引体向上', '仰卧起坐', '1500米', '800米']}
+    for proj in PROJECTS['男'] + PROJECTS['女']:
+        if proj not in values:
+            values[proj] = column(proj)
+
+    male = gender == '男'
+    female = gender == '女'
+
+    # === 按性别拆解合并表头的原始数据（不覆盖已有具体列） ===
+    for combo_col, male_proj, female_proj in [
+        ('仰卧起坐/引体向上', '引体向上', '仰卧起坐'),
+        ('800米/1500米', '1500米', '800米'),
+    ]:
+        if combo_col not in df.columns:
             continue
-
-        df = df[df['性别'].isin(['男', '女'])].copy()
-        if df.empty:
-            print("⚠️ 段落无有效性别数据，跳过")
+        combo = df[combo_col].to_numpy(dtype=object)
+        has_combo = ~pd.isna(combo)
+        for mask, proj in [(male, male_proj), (female, female_proj)]:
+            fill = mask & has_combo & pd.isna(values[proj])
+            values[proj][fill] = combo[fill]
+
+    # === 女生容错映射（避免老师填错列名） ===
+    for proj, fallback in [('800米', '1500米'), ('仰卧起坐', '引体向上')]:
+        fill = female & pd.isna(values[proj]) & ~pd.isna(values[fallback])
+        values[proj][fill] = values[fallback][fill]
+
+    # 在展示用合并列中反映“实际使用的值”；其他项目列即原始列，无需改动
+    result['仰卧起坐/引体向上'] = np.where(male, values['引体向上'], values['仰卧起坐'])
+    result['800米/1500米'] = np.where(male, values['1500米'], values['800米'])
+
+    scores = {col: np.full(n, np.nan, dtype=np.float32) for col in SCORE_FIELDS}
+    status = {col: np.full(n, STATUS_NOT_RATED, dtype=np.int8) for col in SCORE_FIELDS}
+    total = np.zeros(n)
+    count = np.zeros(n, dtype=int)
+
+    for gender_name in ('男', '女'):
+        rows = np.flatnonzero(gender == gender_name)
+        if len(rows) == 0:
             continue
-
-        result = df.copy()
-        remarks = []
-
-        # 确保合并列存在（用于最终展示）
-        for col in [
-            '仰卧起坐/引体向上', '800米/1500米',
-            '仰卧起坐/引体向上_得分', '800米/1500米_得分',
-            '1分钟跳绳', '立定跳远', '抛实心球', '100米',
-            '1分钟跳绳_得分', '立定跳远_得分', '抛实心球_得分', '100米_得分',
-            '总分', '平均分', '备注'
-        ]:
-            if col not in result.columns:
-                result[col] = ""
-
-        for idx, row in df.iterrows():
-            gender = row['性别']
-            rule_dict = MALE_RULES if gender == '男' else FEMALE_RULES
-            score_values = []
-            missing_items = []
-
-            # 拿到一份可修改的行值副本
-            values = row.to_dict()
-
-            # === NEW 1: 按性别拆解合并表头的原始数据 ===
-            # 若源表仅提供了合并列，则把其值映射到实际项目（不覆盖已有具体列）
-            combo_core = row.get('仰卧起坐/引体向上') if '仰卧起坐/引体向上' in df.columns else None
-            if combo_core is not None and not pd.isna(combo_core):
-                if gender == '男' and (('引体向上' not in values) or pd.isna(values.get('引体向上'))):
-                    values['引体向上'] = combo_core
-                if gender == '女' and (('仰卧起坐' not in values) or pd.isna(values.get('仰卧起坐'))):
-                    values['仰卧起坐'] = combo_core
-
-            combo_run = row.get('800米/1500米') if '800米/1500米' in df.columns else None
-            if combo_run is not None and not pd.isna(combo_run):
-                if gender == '男' and (('1500米' not in values) or pd.isna(values.get('1500米'))):
-                    values['1500米'] = combo_run
-                if gender == '女' and (('800米' not in values) or pd.isna(values.get('800米'))):
-                    values['800米'] = combo_run
-
-            # === 既有的“女生容错映射”继续保留（避免老师填错列名） ===
-            if gender == '女':
-                if (('800米' not in values) or pd.isna(values.get('800米'))) and (('1500米' in values) and not pd.isna(values.get('1500米'))):
-                    values['800米'] = values.get('1500米')
-                if (('仰卧起坐' not in values) or pd.isna(values.get('仰卧起坐'))) and (('引体向上' in values) and not pd.isna(values.get('引体向上'))):
-                    values['仰卧起坐'] = values.get('引体向上')
-
-            # 在展示用合并列中反映“实际使用的值”
-            result.at[idx, '仰卧起坐/引体向上'] = values.get('引体向上') if gender == '男' else values.get('仰卧起坐')
-            result.at[idx, '800米/1500米'] = values.get('1500米') if gender == '男' else values.get('800米')
-
-            # 其他项目直接抄
-            for proj in ['1分钟跳绳', '立定跳远', '抛实心球', '100米']:
-                result.at[idx, proj] = values.get(proj, '')
-
-            # 评分
-            for proj in rule_dict:
-                if proj in ['引体向上', '仰卧起坐']:
-                    col_name = '仰卧起坐/引体向上_得分'
-                elif proj in ['1500米', '800米']:
-                    col_name = '800米/1500米_得分'
-                else:
-                    col_name = f'{proj}_得分'
-
-                val = values.get(proj)
-                if pd.isna(val):
-                    result.at[idx, col_name] = "无"
-                    missing_items.append(proj)
-                    continue
-
-                if proj in time_projects:
-                    parsed = parse_time(val)
-                    if parsed is None:
-                        result.at[idx, col_name] = "无"
-                        missing_items.append(f"{proj}(时间格式错误)")
-                        continue
-                    val_num = parsed
-                else:
-                    try:
-                        val_num = float(val)
-                    except:
-                        result.at[idx, col_name] = "无"
-                        missing_items.append(f"{proj}(非数值)")
-                        continue
-
-                matched = False
-                for low, up, pts in rule_dict[proj]:
-                    if low <= val_num <= up:
-                        result.at[idx, col_name] = pts
-                        score_values.append(pts)
-                        matched = True
-                        break
-
-                if not matched:
-                    result.at[idx, col_name] = "无"
-                    missing_items.append(f"{proj}(超范围)")
-
-            if score_values:
-                result.at[idx, '总分'] = sum(score_values)
-                result.at[idx, '平均分'] = round(sum(score_values) / len(score_values), 2)
+        for proj, table in rules.tables(gender_name):
+            col_name = SCORE_COLUMNS.get(proj, f'{proj}_得分')
+
+            raw = values[proj][rows]
+            missing = pd.isna(raw)
+            if proj in TIME_PROJECTS:
+                nums, bad = _coerce_time(raw[~missing])
+                bad_status = STATUS_FORMAT_ERROR
             else:
-                result.at[idx, '总分'] = "无"
-                result.at[idx, '平均分'] = "无"
-
-            remarks.append("缺：" + "、".join(missing_items) if missing_items else "")
+                nums, bad = _coerce_numeric(raw[~missing])
+                bad_status = STATUS_NON_NUMERIC
+
+            pts = np.full(len(rows), np.nan)
+            pts[~missing] = table.lookup(nums)
+            bad_all = np.zeros(len(rows), dtype=bool)
+            bad_all[~missing] = bad
+            pts[bad_all] = np.nan
+            matched = ~np.isnan(pts)
+
+            codes = np.full(len(rows), STATUS_OUT_OF_RANGE, dtype=np.int8)
+            codes[missing] = STATUS_MISSING
+            codes[bad_all] = bad_status
+            codes[matched] = STATUS_OK
+            status[col_name][rows] = codes
+            scores[col_name][rows] = pts
+
+            # 总分按 float64 累加，与逐项相加的结果一致
+            total[rows[matched]] += pts[matched]
+            count[rows[matched]] += 1
+
+    for col in SCORE_FIELDS:
+        result[col] = scores[col]
+        result[STATUS_COLUMNS[col]] = status[col]
+
+    has_score = count > 0
+    averages = np.full(n, np.nan)
+    averages[has_score] = [round(t / c, 2) for t, c in zip(total[has_score].tolist(), count[has_score].tolist())]
+    result['总分'] = np.where(has_score, total, np.nan)
+    result['平均分'] = averages
+
+STANDARD_COLUMNS = [
+    '序号', '班级', '学号', '性别', '姓名',
+    '仰卧起坐/引体向上', '800米/1500米', '1分钟跳绳', '立定跳远', '抛实心球', '100米',
+    '仰卧起坐/引体向上_得分', '800米/1500米_得分',
+    '1分钟跳绳_得分', '立定跳远_得分', '抛实心球_得分', '100米_得分',
+    '总分', '平均分', '备注'
+]
+
+# 每个段落的评分结果在原始列之外一定包含的列（得分、状态、总分、平均分由 score_segment 写入）
+SEGMENT_RESULT_COLUMNS = [
+    '仰卧起坐/引体向上', '800米/1500米', '1分钟跳绳', '立定跳远', '抛实心球', '100米',
+    *SCORE_FIELDS, '总分', '平均分', *STATUS_COLUMNS.values()
+]
+
+# 内部总表的列：STANDARD_COLUMNS 去掉导出时才生成的“备注”，加上各得分的状态列
+RESULT_COLUMNS = [c for c in STANDARD_COLUMNS if c != '备注'] + list(STATUS_COLUMNS.values())
+RESULT_DTYPES = {
+    '序号': 'int32', '班级': 'category', '性别': 'category', '总分': 'float64', '平均分': 'float64',
+    **{col: 'float32' for col in SCORE_FIELDS},
+    **{col: 'int8' for col in STATUS_COLUMNS.values()},
+}
+
+# 段落至少要有其中一列才评分（缓测、免测名单等只有学生信息的表不是成绩表）
+SCORABLE_COLUMNS = list(dict.fromkeys(PROJECTS['男'] + PROJECTS['女'] + ['仰卧起坐/引体向上', '800米/1500米']))
+
+def valid_segment_rows(df):
+    """段落中参与评分的行（性别为男/女）；缺少必要字段、没有任何项目列或没有有效行时返回 None。"""
+    required_cols = ['姓名', '性别', '班级']
+    missing = [col for col in required_cols if col not in df.columns]
+    if missing:
+        print(f"⚠️ 段落缺少字段 {'、'.join(missing)}，跳过")
+        return None
+    if not any(col in df.columns for col in SCORABLE_COLUMNS):
+        print("⚠️ 段落没有可评分的项目列（可能是缓测/免测名单），跳过")
+        return None
 
-        result['备注'] = remarks
-        result['序号'] = range(1, len(result) + 1)
-        all_results.append(result)
+    df = df[df['性别'].isin(['男', '女'])].copy()
+    if df.empty:
+        print("⚠️ 段落无有效性别数据，跳过")
+        return None
+    return df
 
-    if not all_results:
-        print("❌ 没有有效数据段落，评分失败")
+def score_raw_segment(df, rules=None):
+    """评分一个原始段落（以表头为列名），返回评分结果 DataFrame；缺少必要字段或无有效性别数据时返回 None。"""
+    df = valid_segment_rows(df)
+    if df is None:
         return None
+    return score_valid_rows(df, rules)
 
-    final_result = pd.concat(all_results, ignore_index=True)
+def score_valid_rows(df, rules=None):
+    """
+    按评分标准 rules（RuleSet，默认为内置标准）评分已经过 valid_segment_rows 筛选的行，
+    序号按行顺序从 1 开始；返回内部结果（见 RESULT_COLUMNS）。
+    """
+    # 原表中的“备注”等同名列由导出时生成的内容取代
+    result = df.drop(columns=[c for c in ['备注', '总分', '平均分'] if c in df.columns])
+
+    # 确保合并列存在（用于最终展示）
+    for col in SEGMENT_RESULT_COLUMNS:
+        if col not in result.columns:
+            result[col] = ""
+
+    score_segment(df, result, rules or get_rules())
 
-    standard_columns = [
-        '序号', '班级', '学号', '性别', '姓名',
-        '仰卧起坐/引体向上', '800米/1500米', '1分钟跳绳', '立定跳远', '抛实心球', '100米',
-        '仰卧起坐/引体向上_得分', '800米/1500米_得分',
-        '1分钟跳绳_得分', '立定跳远_得分', '抛实心球_得分', '100米_得分',
-        '总分', '平均分', '备注'
-    ]
+    result['序号'] = np.arange(1, len(result) + 1, dtype=np.int32)
+    return result
 
-    for col in standard_columns:
+def combine_results(all_results):
+    """合并各段落的评分结果，按 RESULT_COLUMNS 排列（缺列补空），转为 RESULT_DTYPES 中的紧凑类型。"""
+    final_result = pd.concat(all_results, ignore_index=True)
+
+    for col in RESULT_COLUMNS:
         if col not in final_result.columns:
             final_result[col] = ""
 
-    final_result = final_result[standard_columns]
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    total_file = f"总表_评分结果_{timestamp}.xlsx"
-    final_result.to_excel(total_file, index=False)
-    beautify_excel(total_file)
-    print(f"✅ 总表已保存：{total_file}")
-
-    grouped = final_result.groupby('班级')
-    for class_name, class_df in grouped:
-        class_df = class_df.copy()
-        for col in standard_columns:
-            if col not in class_df.columns:
-                class_df[col] = ""
-        class_df = class_df[standard_columns]
-
-        safe_name = "".join(c if c.isalnum() or c in "_-" else "_" for c in str(class_name))
-        file_name = f"{safe_name}_评分结果_{timestamp}.xlsx"
-        class_df.to_excel(file_name, index=False)
-        beautify_excel(file_name)
-        print(f"✅ 分班表已保存：{file_name}")
-
-    print("🎉 所有评分文件已生成完毕")
-    return total_file
+    return final_result[RESULT_COLUMNS].astype(RESULT_DTYPES)
+
+def _display_values(values, decimals=None):
+    """数值列转为导出用的对象数组，NaN 写为“无”；decimals 用于把 float32 得分还原为规则中的两位小数原值。"""
+    values = np.asarray(values, dtype=np.float64)
+    shown = np.array((values if decimals is None else np.round(values, decimals)).tolist(), dtype=object)
+    shown[np.isnan(values)] = "无"
+    return shown
+
+def _result_remarks(final_result):
+    """由状态列生成每行的备注（“缺：…”），项目顺序与评分规则一致。"""
+    remark = np.full(len(final_result), "", dtype=object)
+    gender = final_result['性别'].to_numpy(dtype=object)
+    for gender_name, projects in PROJECTS.items():
+        rows = np.flatnonzero(gender == gender_name)
+        if len(rows) == 0:
+            continue
+        for proj in projects:
+            col_name = SCORE_COLUMNS.get(proj, f'{proj}_得分')
+            notes = np.array([note.format(proj) for note in STATUS_NOTES], dtype=object)
+            codes = final_result[STATUS_COLUMNS[col_name]].to_numpy()[rows]
+            remark[rows] = _join_remarks(remark[rows], notes[codes])
+    return np.where(remark == "", "", "缺：" + remark).tolist()
+
+def display_result(final_result):
+    """
+    内部结果转为导出给老师的表（STANDARD_COLUMNS）：无得分的单元格为“无”，备注为“缺：…”，
+    其余列取原值。写 Excel、预览和比较导出内容时使用；内部结果本身不含这些文本。
+    """
+    columns = {}
+    for col in STANDARD_COLUMNS:
+        if col == '备注':
+            columns[col] = _result_remarks(final_result)
+        elif col in SCORE_FIELDS:
+            columns[col] = _display_values(final_result[col], 2)
+        elif col in ('总分', '平均分'):
+            columns[col] = _display_values(final_result[col])
+        else:
+            columns[col] = final_result[col].to_numpy(dtype=object)
+    return pd.DataFrame(columns, index=final_result.index, dtype=object)
+
+def _no_progress(fraction, message):
+    pass
+
+def input_sheets(file_path):
+    """
+    读取评分输入，返回 (逐个工作表的 (表名, 行迭代器), 预计总行数，未知时为 0)，供 sheet_segments 切段：
+    CSV/Parquet 表格直接读取，不经过 xlsx 解析，视为一个工作表；其余按 xlsx 用 openpyxl 流式读取所有可见工作表。
+    """
+    if is_table_input(file_path):
+        rows = read_table_rows(file_path)
+        return [(os.path.basename(file_path), rows)], len(rows)
+    return read_sheets(file_path), sheet_rows(file_path) or 0
+
+def segment_label(info):
+    """段落位置的说明文字，例如“工作表 Sheet1 第 3–40 行”。"""
+    return f"工作表 {info['sheet']} 第 {info['header_row']}–{info['last_row']} 行"
+
+def report_aliases(info, metrics):
+    """打印并记录段落表头中应用的别名和评分标准不支持的项目列。"""
+    if info['aliases']:
+        print(f"🔤 表头别名：{format_aliases(info['aliases'])}")
+    if info['unsupported']:
+        print(f"⚠️ 评分标准不支持的项目，未评分：{'、'.join(info['unsupported'])}")
+    metrics.add_aliases(info['aliases'], info['unsupported'])
+
+def _scaled_progress(progress, start, end):
+    """把子步骤 0~1 的进度映射到整体进度的 [start, end] 区间。"""
+    return lambda fraction, message: progress(start + (end - start) * fraction, message)
+
+def score_workbook(file_path, metrics=None, progress=None, rules=None):
+    """
+    按评分标准 rules（RuleSet，默认为内置标准）读取并评分整个工作簿，
+    返回内部总表 DataFrame（见 RESULT_COLUMNS；无有效数据时返回 None）。
+    metrics 为 RunMetrics 时记录 read / segment_detection / scoring / combine 各阶段耗时和行数；
+    progress(完成比例, 说明) 在每个段落评分后调用，比例按已读行数占工作表行数估算。
+    """
+    metrics = metrics or RunMetrics()
+    progress = progress or _no_progress
+    sheets, total_rows = input_sheets(file_path)
+    all_results = []
+    segment_count = 0
+
+    # 流式读取：每识别出一个表头段落就立即评分，不在内存中保留整张表；
+    # 读取和段落识别交替进行，段落识别的耗时扣除其中读取行的时间
+    read_before = metrics.stages.get('read', 0.0)
+    sheets = ((name, metrics.timed('read', rows)) for name, rows in metrics.timed('read', sheets))
+    for info, df in metrics.timed('segment_detection', sheet_segments(sheets)):
+        segment_count += 1
+        metrics.count('segments')
+        metrics.count('rows_read', len(df))
+        print(f"🔍 识别到第 {segment_count} 个表头段落（{segment_label(info)}）")
+        report_aliases(info, metrics)
+        with metrics.stage('scoring'):
+            result = score_raw_segment(df, rules)
+        if result is None:
+            metrics.count('segments_skipped')
+        else:
+            metrics.count('rows_scored', len(result))
+            all_results.append(result)
+        rows_seen = metrics.counts['rows_read'] + segment_count
+        progress(min(rows_seen / total_rows, 1.0) if total_rows else 0.0, f"已评分第 {segment_count} 个表头段落")
+    metrics.stages['segment_detection'] -= metrics.stages.get('read', 0.0) - read_before
+
+    print(f"🔍 共识别到 {segment_count} 个表头段落")
+    if not all_results:
+        print("❌ 没有有效数据段落，评分失败")
+        return None
+
+    with metrics.stage('combine'):
+        return combine_results(all_results)
+
+def in_memory_manifest(final_result, timestamp, stats=None):
+    """
+    内存结果清单：总表（含统计工作表）、各分班表和分班 zip 都是按需生成的内存文件，
+    只有在调用 getvalue() 时才序列化为字节。stats 为已算好的 cohort_stats 结果（例如取自缓存），None 时重新计算。
+    """
+    table = display_result(final_result)
+    stats = cohort_stats(final_result) if stats is None else stats
+    class_workbooks = lazy_class_workbooks(table, STANDARD_COLUMNS, timestamp)
+    return {
+        'timestamp': timestamp,
+        'final_result': final_result,
+        'cohort_stats': stats,
+        'total_workbook': LazyWorkbook(table, f"总表_评分结果_{timestamp}.xlsx", extra_sheets=stats),
+        'class_workbooks': class_workbooks,
+        'zip_archive': LazyZip(class_workbooks, f"分班_评分结果_{timestamp}.zip"),
+    }
+
+def process_scores(file_path, output_dir=None, export_workers=None, make_zip=False, in_memory=False, metrics=None,
+                   progress=None, columnar=None, standard=None):
+    """
+    评分主流程：读取、评分并把总表和分班表写到 output_dir（默认当前目录），
+    返回结果清单 dict（无有效数据时返回 None）：
+      output_dir / timestamp / total_file / class_files（成功写出的分班文件）/ zip_file / export_records /
+      final_result（内部总表 DataFrame，见 RESULT_COLUMNS；导出内容用 display_result 转换）/
+      cohort_stats（统计汇总和排名 {工作表名: DataFrame}，也写在总表的附加工作表中）/ metrics（RunMetrics 运行指标）/ columnar_file
+    export_workers 为分班文件并行导出的进程数（默认 CPU 核数），make_zip 为 True 时另外打包所有分班文件。
+    in_memory 为 True 时不写任何文件，返回 in_memory_manifest 的内存结果清单（file_path 也可以是 BytesIO）。
+    metrics 可传入事先创建的 RunMetrics（例如打开了 cProfile），无有效数据时也能从中取到指标。
+    progress(完成比例, 说明) 在每个段落评分、总表写出和每个分班文件写出后调用。
+    file_path 也可以是 .csv/.parquet 表格；文件模式下 columnar 为 'parquet' 或 'arrow' 时另外导出列式总表（需要 pyarrow）。
+    standard 为评分标准的名称（见 rule_registry.available_standards，默认为内置标准），结果清单的 standard 为实际使用的标准名。
+    """
+    progress = progress or _no_progress
+    if metrics is None:
+        metrics = RunMetrics(source=file_path if isinstance(file_path, str) else None)
+    with metrics.run():
+        if columnar and not in_memory:
+            require_columnar(columnar)
+        rules = get_rules(standard)
+        print(f"📥 正在读取文件：{file_path}（评分标准：{rules.label}）")
+        if not in_memory:
+            with metrics.stage('clean_old_files'):
+                clean_old_files(output_dir)
+
+        # 文件模式下评分占整体进度的 70%，其余为写出总表和分班文件
+        final_result = score_workbook(file_path, metrics, _scaled_progress(progress, 0.0, 1.0 if in_memory else 0.7),
+                                      rules)
+        if final_result is None:
+            metrics.status = 'no_data'
+            return None
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        with metrics.stage('cohort_stats'):
+            stats = cohort_stats(final_result)
+        if in_memory:
+            print("🎉 评分完成，结果保存在内存中")
+            manifest = in_memory_manifest(final_result, timestamp, stats)
+            manifest['standard'] = rules.label
+            manifest['metrics'] = metrics
+            metrics.status = 'ok'
+            return manifest
+
+        total_file = os.path.join(output_dir or '', f"总表_评分结果_{timestamp}.xlsx")
+        with metrics.stage('total_export'):
+            start = time.perf_counter()
+            table = display_result(final_result)
+            write_styled_excel(table, total_file, extra_sheets=stats)
+        metrics.add_files([{'班级': '总表', '文件': total_file, '耗时': time.perf_counter() - start, '错误': None}])
+        print(f"✅ 总表已保存：{total_file}")
+        progress(0.8, "总表已保存")
+
+        with metrics.stage('class_export'):
+            records, zip_file = export_class_files(table, STANDARD_COLUMNS, timestamp, output_dir=output_dir,
+                                                   workers=export_workers, make_zip=make_zip,
+                                                   progress=_scaled_progress(progress, 0.8, 1.0))
+        metrics.add_files(records)
+
+        columnar_file = None
+        if columnar:
+            columnar_file = os.path.join(output_dir or '', columnar_file_name(timestamp, columnar))
+            with metrics.stage('columnar_export'):
+                write_columnar(final_result, table, columnar_file, columnar)
+            print(f"✅ 列式总表已保存：{columnar_file}")
+
+        print("🎉 所有评分文件已生成完毕")
+        metrics.status = 'ok'
+        return {
+            'output_dir': output_dir or '.',
+            'timestamp': timestamp,
+            'total_file': total_file,
+            'class_files': [r['文件'] for r in records if r['错误'] is None],
+            'zip_file': zip_file,
+            'export_records': records,
+            'final_result': final_result,
+            'cohort_stats': stats,
+            'standard': rules.label,
+            'metrics': metrics,
+            'columnar_file': columnar_file,
+        }
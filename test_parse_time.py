@@ -0,0 +1,57 @@
+# test_parse_time.py
+# parse_time_series 与逐格 parse_time 的等价性（基于 hypothesis 的性质测试）：
+# 整数、浮点数（m.ss）、"m:ss"、全角 "m：ss"、脏文本、None / NaN 混在同一列中，逐格结果必须一致。
+#
+# 用法（需要 pip install pytest hypothesis）：
+#   python -m pytest test_parse_time.py
+
+import math
+import numpy as np
+from hypothesis import given, settings, strategies as st
+from scoring_script import parse_time, parse_time_series
+
+_minutes = st.integers(min_value=0, max_value=20)
+_seconds = st.integers(min_value=0, max_value=99)
+_colons = st.sampled_from([':', '：'])
+_spaces = st.sampled_from(['', ' ', '  ', '\t', '　'])
+
+mss_text = st.builds(
+    lambda lead, m, sep_l, colon, sep_r, sec, pad, trail: f"{lead}{m}{sep_l}{colon}{sep_r}{sec:0{pad}d}{trail}",
+    _spaces, _minutes, st.sampled_from(['', ' ']), _colons, st.sampled_from(['', ' ']), _seconds,
+    st.sampled_from([1, 2, 3]), _spaces,
+)
+decimal_text = st.builds(lambda m, s: f"{m}:{s}", _minutes, st.floats(min_value=0, max_value=70).map(lambda v: round(v, 2)))
+quote_text = st.builds(lambda m, q, s: f"{m}{q}{s:02d}", _minutes, st.sampled_from(["'", '’', '′']), _seconds)
+dirty_text = st.sampled_from(['缺考', '免测', '', ' ', '3:75', '3.5.1', '4：0５', '12a', '#N/A', '4::20', ':30', '4:'])
+cells = st.one_of(
+    st.none(),
+    st.just(np.nan),
+    st.integers(min_value=-10, max_value=1000),
+    st.floats(allow_nan=True, allow_infinity=True),
+    st.floats(min_value=0, max_value=15).map(lambda v: round(v, 2)),
+    mss_text,
+    decimal_text,
+    quote_text,
+    dirty_text,
+    st.text(max_size=8),
+)
+
+def _expected(value):
+    parsed = parse_time(value)
+    if parsed is None:
+        return math.nan
+    return parsed if abs(parsed) < 1e300 else math.inf
+
+@settings(max_examples=500, deadline=None)
+@given(st.lists(cells, max_size=40))
+def test_parse_time_series_matches_parse_time(values):
+    seconds, errors = parse_time_series(values)
+    for i, value in enumerate(values):
+        expected = _expected(value)
+        got = seconds.iloc[i]
+        if math.isnan(expected):
+            assert math.isnan(got), (value, got)
+        else:
+            assert got == expected, (value, got, expected)
+        missing = value is None or (isinstance(value, float) and math.isnan(value))
+        assert errors.iloc[i] == (not missing and math.isnan(expected)), value
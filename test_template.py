@@ -0,0 +1,20 @@
+# test_template.py
+# 用仓库自带的 评分模板.xlsx 跑完整评分流程：只评分“测试名单”中的成绩段落，
+# 缓测、免测名单等没有项目列的工作表不参与评分，也不生成多余的分班表。
+#
+# 用法（需要 pip install pytest）：
+#   python -m pytest test_template.py
+
+import os
+from scoring_script import process_scores
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '评分模板.xlsx')
+
+def test_template_scores_only_result_sheets(tmp_path):
+    manifest = process_scores(TEMPLATE, output_dir=str(tmp_path))
+    final_result = manifest['final_result']
+    assert len(final_result) == 39
+    assert not final_result.duplicated(['班级', '学号', '姓名']).any()
+    assert len(manifest['class_files']) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [os.path.basename(manifest['total_file'])] + [os.path.basename(p) for p in manifest['class_files']])
@@ -0,0 +1,65 @@
+# workspace.py
+# 评分任务工作目录：每个任务在临时目录下拥有独立的子目录和唯一任务号，
+# 上传文件和所有结果文件都写在其中，不同会话互不干扰；过期目录按 TTL 统一清理。
+
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+JOBS_ROOT = os.environ.get('SCORING_JOBS_ROOT') or os.path.join(tempfile.gettempdir(), 'student_scoring_jobs')
+# 任务目录最后一次使用后保留的秒数
+JOB_TTL = int(os.environ.get('SCORING_JOB_TTL', 2 * 3600))
+
+def new_job_id():
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+class JobWorkspace:
+    """单个评分任务的独立目录。"""
+
+    def __init__(self, job_id=None, root=None):
+        self.job_id = job_id or new_job_id()
+        self.root = root or JOBS_ROOT
+        self.path = os.path.join(self.root, self.job_id)
+        os.makedirs(self.path, exist_ok=True)
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def save_upload(self, data, name='raw_scores.xlsx'):
+        """把上传的字节写入任务目录，返回文件路径。"""
+        path = self.file(name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def touch(self):
+        """标记任务仍在使用，推迟 TTL 清理。"""
+        if os.path.isdir(self.path):
+            os.utime(self.path)
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def cleanup_expired(root=None, ttl=None):
+    """删除超过 TTL 未使用的任务目录，返回删除的目录数。"""
+    root = root or JOBS_ROOT
+    ttl = JOB_TTL if ttl is None else ttl
+    if not os.path.isdir(root):
+        return 0
+    now = time.time()
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isdir(path) and now - os.path.getmtime(path) > ttl:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError as e:
+            print(f"⚠️ 无法清理任务目录 {path}：{e}")
+    return removed